@@ -0,0 +1,49 @@
+"""
+Run the labeling, inference and evaluation steps end to end.
+Baseline and genie inference only depend on the labeled contracts, so they run
+concurrently on one AsyncOpenAI client and share one request budget
+(OPENAI_CONCURRENCY in-flight requests across both).
+"""
+import os
+import asyncio
+from src.pipeline.llm_labeler import run as run_labeling
+from src.utils.openai_client import OPENAI_CONCURRENCY, make_async_client
+from src.agents.baseline_classifier import run_baseline_inference_async
+from src.agents.genie_classifier import run_genie_inference_async
+from src.evaluation.compare_methods import run as run_evaluation
+
+async def run_inference():
+    """Run baseline and genie inference concurrently."""
+    sem = asyncio.Semaphore(OPENAI_CONCURRENCY)
+    async with make_async_client(os.getenv("OPENAI_API_KEY")) as client:
+        await asyncio.gather(
+            run_baseline_inference_async(
+                "data/contracts_labeled.csv",
+                "outputs/baseline_inference.csv",
+                "outputs/baseline_metrics.json",
+                client=client,
+                sem=sem
+            ),
+            run_genie_inference_async(
+                "data/contracts_labeled.csv",
+                "genie/worksheet_template.csv",
+                "outputs/genie_inference.csv",
+                "outputs/genie_metrics.json",
+                client=client,
+                sem=sem
+            )
+        )
+
+
+if __name__ == "__main__":
+    run_labeling(
+        "data/contracts_raw.csv",
+        "data/contracts_labeled.csv",
+        "outputs/labeling_metrics.json"
+    )
+    asyncio.run(run_inference())
+    run_evaluation(
+        "outputs/baseline_inference.csv",
+        "outputs/genie_inference.csv",
+        "outputs/evaluation_summary.json"
+    )
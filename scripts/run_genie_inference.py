@@ -1,6 +1,6 @@
-from src.utils.io import read_csv, write_csv
+from src.utils.io import read_csv, write_csv, write_json
 from src.agents.genie_agent import classify_and_explain
-from src.pipeline.inference_metrics import run as run_infer_metrics  # NEW
+from src.pipeline.inference_metrics import compute as compute_infer_metrics  # NEW
 import os
 
 DATA = "data/dataset.csv"
@@ -24,8 +24,8 @@ def main():
     print("Genie inference complete.")
     print(f"- Wrote {OUT}")
 
-    # NEW: compute and save inference metrics
-    run_infer_metrics(OUT, INFER_METRICS)
+    # NEW: compute and save inference metrics from the rows already in memory
+    write_json(INFER_METRICS, compute_infer_metrics(out_rows))
     print(f"- Wrote {INFER_METRICS}")
 
     # Write two example text outputs for quick viewing
@@ -3,11 +3,14 @@ Baseline LLM classifier.
 Single-shot SAFE/UNSAFE classification without worksheets.
 """
 import os
+import asyncio
 import openai
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dotenv import load_dotenv
-from src.utils.io import read_csv, write_csv, write_json
-from src.pipeline.inference_metrics import compute
+from src.utils import llm_cache
+from src.utils.ratelimiter import get_limiter
+from src.utils.openai_client import RETRYABLE_ERRORS, make_client, make_async_client
+from src.pipeline.inference import run_inference_async
 
 load_dotenv()
 
@@ -18,6 +21,13 @@ if not OPENAI_API_KEY:
 # Use a smaller OpenAI model by default; override via OPENAI_MODEL if desired.
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
+# Routes requests that share the prompt prefix to the same cache-warm backend.
+PROMPT_CACHE_KEY = "baseline-safety-v1"
+
+# Shared clients so every call reuses one HTTP connection pool.
+_CLIENT = make_client(OPENAI_API_KEY)
+_ASYNC_CLIENT = make_async_client(OPENAI_API_KEY)
+
 
 BASELINE_PROMPT = """You are a security analyst for Solidity ERC20-style transfer functions.
 Classify the function as SAFE or UNSAFE, then explain your reasoning.
@@ -45,54 +55,105 @@ EXPLANATION: <short explanation of why>.
 Do not put any other content before LABEL:.
 """
 
+# BASELINE_PROMPT split around {code} once, so each call is a plain concatenation.
+_BASELINE_PREFIX, _BASELINE_SUFFIX = BASELINE_PROMPT.split("{code}")
+
+
+def build_baseline_prompt(code: str) -> str:
+    """Fill BASELINE_PROMPT with the contract code."""
+    return _BASELINE_PREFIX + code + _BASELINE_SUFFIX
+
+
+def parse_baseline_response(raw: str) -> Dict:
+    """Parse the LABEL/EXPLANATION response from the LLM."""
+    lines = [l for l in raw.splitlines() if l.strip()]
+
+    # Default values
+    status = "unsafe"
+    explanation = raw
+
+    if lines:
+        first = lines[0].strip()
+        upper_first = first.upper()
+        # Expected format: LABEL: SAFE or LABEL: UNSAFE
+        if upper_first.startswith("LABEL:"):
+            label_token = upper_first.split(":", 1)[1].strip()
+        else:
+            # Fallback: first token on the line
+            label_token = upper_first.split()[0]
+
+        if "UNSAFE" in label_token:
+            status = "unsafe"
+        elif "SAFE" in label_token:
+            status = "safe"
+
+        # Explanation: prefer second line starting with EXPLANATION:
+        if len(lines) > 1:
+            second = lines[1].strip()
+            if second.upper().startswith("EXPLANATION:"):
+                explanation = second.split(":", 1)[1].strip() or raw
+            else:
+                explanation = "\n".join(lines[1:]).strip() or raw
+
+    return {
+        "status": status,
+        "explanation": explanation
+    }
+
+
+def _cache_key(code: str) -> str:
+    return llm_cache.make_key(OPENAI_MODEL, BASELINE_PROMPT, llm_cache.canonicalize_code(code))
+
 
 def classify(code: str) -> Dict:
     """Classify a contract as safe or unsafe using baseline LLM."""
+    key = _cache_key(code)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
     try:
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
+        response = _CLIENT.chat.completions.create(
             model=OPENAI_MODEL,
             messages=[
-                {"role": "user", "content": BASELINE_PROMPT.format(code=code)}
+                {"role": "user", "content": build_baseline_prompt(code)}
             ],
             temperature=0.0,
-            max_tokens=200
+            max_tokens=200,
+            prompt_cache_key=PROMPT_CACHE_KEY
         )
-        raw = response.choices[0].message.content.strip()
-        lines = [l for l in raw.splitlines() if l.strip()]
-
-        # Default values
-        status = "unsafe"
-        explanation = raw
-
-        if lines:
-            first = lines[0].strip()
-            upper_first = first.upper()
-            # Expected format: LABEL: SAFE or LABEL: UNSAFE
-            if upper_first.startswith("LABEL:"):
-                label_token = upper_first.split(":", 1)[1].strip()
-            else:
-                # Fallback: first token on the line
-                label_token = upper_first.split()[0]
-
-            if "UNSAFE" in label_token:
-                status = "unsafe"
-            elif "SAFE" in label_token:
-                status = "safe"
-
-            # Explanation: prefer second line starting with EXPLANATION:
-            if len(lines) > 1:
-                second = lines[1].strip()
-                if second.upper().startswith("EXPLANATION:"):
-                    explanation = second.split(":", 1)[1].strip() or raw
-                else:
-                    explanation = "\n".join(lines[1:]).strip() or raw
-
+        result = parse_baseline_response((response.choices[0].message.content or "").strip())
+        llm_cache.put(key, result)
+        return result
+    except RETRYABLE_ERRORS as e:
+        print(f"Baseline classification error: {e}")
         return {
-            "status": status,
-            "explanation": explanation
+            "status": "unsafe",
+            "explanation": f"Error during classification: {e}"
         }
-    except Exception as e:
+
+
+async def classify_async(client: openai.AsyncOpenAI, code: str) -> Dict:
+    """Async variant of classify() for concurrent inference runs."""
+    key = _cache_key(code)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+    try:
+        prompt = build_baseline_prompt(code)
+        await get_limiter().acquire(estimated_tokens=len(prompt) // 4 + 200)
+        response = await client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.0,
+            max_tokens=200,
+            prompt_cache_key=PROMPT_CACHE_KEY
+        )
+        result = parse_baseline_response((response.choices[0].message.content or "").strip())
+        llm_cache.put(key, result)
+        return result
+    except RETRYABLE_ERRORS as e:
         print(f"Baseline classification error: {e}")
         return {
             "status": "unsafe",
@@ -100,33 +161,30 @@ def classify(code: str) -> Dict:
         }
 
 
+async def run_baseline_inference_async(
+    input_csv: str,
+    output_csv: str,
+    metrics_json: str,
+    client: Optional[openai.AsyncOpenAI] = None,
+    sem: Optional[asyncio.Semaphore] = None
+):
+    """
+    Stream labeled contracts through the baseline classifier (see
+    run_inference_async). Pass a shared client and semaphore to run alongside
+    other inference tasks.
+    """
+    client = client or _ASYNC_CLIENT
+    await run_inference_async(
+        "Baseline", input_csv, output_csv, metrics_json,
+        classify=lambda code: classify_async(client, code),
+        columns=["explanation"],
+        sem=sem
+    )
+
+
 def run_baseline_inference(input_csv: str, output_csv: str, metrics_json: str):
     """Run baseline inference on labeled contracts."""
-    rows = read_csv(input_csv)
-    results = []
-    
-    for i, row in enumerate(rows):
-        print(f"Baseline inference {i+1}/{len(rows)}...")
-        code = row["code"]
-        result = classify(code)
-        results.append({
-            "id": row["id"],
-            "gold_label": row["final_label"],
-            "agent_status": result["status"],
-            "explanation": result["explanation"]
-        })
-    
-    write_csv(
-        output_csv,
-        results,
-        fieldnames=["id", "gold_label", "agent_status", "explanation"]
-    )
-    
-    metrics = compute(output_csv)
-    write_json(metrics_json, metrics)
-    
-    print(f"Baseline inference complete. Saved to {output_csv}")
-    print(f"Metrics saved to {metrics_json}")
+    asyncio.run(run_baseline_inference_async(input_csv, output_csv, metrics_json))
 
 
 if __name__ == "__main__":
@@ -1,15 +1,12 @@
 import re
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
+from src.utils.solidity import blank_inert
 
 REQ = re.compile(r"require\s*\(\s*[^)]*>=\s*[^)]*\)")
 
 def classify_and_explain(code: str) -> Dict:
-    lines = code.splitlines()
-    cite = None
-    for i, line in enumerate(lines, start=1):
-        if REQ.search(line):
-            cite = i
-            break
+    m = REQ.search(code)
+    cite = code.count("\n", 0, m.start()) + 1 if m else None
     status = "safe" if cite is not None else "unsafe"
     explanation = (
         f"Detected balance check via require(... >= ...) on line {cite}."
@@ -17,3 +14,91 @@ def classify_and_explain(code: str) -> Dict:
         "No balance check (require(... >= ...)) found before updating balances."
     )
     return {"status": status, "citation_line": cite, "explanation": explanation}
+
+# require(<map>[<slot>] >= <amount>) naming the balance slot that gets debited; the
+# condition must end at the amount, so `... >= amount || owner` does not qualify.
+BALANCE_REQ = re.compile(r"require\s*\(\s*(\w+)\s*\[\s*([^\]]+?)\s*\]\s*>=\s*(\w+)\s*[,)]")
+# Constructs the prescreen does not reason about; their presence always defers to the LLM.
+RISKY = re.compile(r"\bunchecked\b|\.call\b|\bdelegatecall\b|\btx\.origin\b|\bassembly\b|\bselfdestruct\b")
+# Block headers whose body may run zero or several times.
+_BRANCH_RE = re.compile(r"\b(?:if|else|for|while|do)\b")
+_FUNCTION_RE = re.compile(r"\b(?:function|modifier|constructor|fallback|receive)\b")
+
+def _open_blocks(code: str, pos: int) -> List[Tuple[int, str]]:
+    """
+    Brace blocks open at pos as (offset, header) pairs, outermost first, followed
+    by the unterminated statement that pos belongs to.
+    """
+    blocks = []
+    start = depth = 0
+    for m in re.finditer(r"[{};()]", code[:pos]):
+        c = m.group()
+        # Semicolons inside parentheses, e.g. in a for header, don't end a statement
+        if c in "()":
+            depth = max(0, depth + (1 if c == "(" else -1))
+            continue
+        if c == ";" and depth:
+            continue
+        if c == "{":
+            blocks.append((m.start(), code[start:m.start()]))
+        elif c == "}" and blocks:
+            blocks.pop()
+        start = m.end()
+    blocks.append((pos, code[start:pos]))
+    return blocks
+
+def _unconditional_scope(code: str, pos: int) -> Optional[int]:
+    """
+    Offset of the function body that always runs the statement at pos (-1 for a
+    bare snippet), or None when the statement sits in a branch or loop.
+    """
+    blocks = _open_blocks(code, pos)
+    inner = [i for i, (_, header) in enumerate(blocks) if _FUNCTION_RE.search(header)]
+    first = inner[-1] + 1 if inner else 0
+    if any(_BRANCH_RE.search(header) for _, header in blocks[first:]):
+        return None
+    return blocks[inner[-1]][0] if inner else -1
+
+def prescreen(code: str) -> Optional[Dict]:
+    """
+    Cheap deterministic check run before any LLM call.
+    Returns a SAFE verdict only when an unconditional balance check guards exactly the
+    slot that the same function then debits by exactly the amount, the amount is
+    credited exactly once to a different slot, and nothing risky appears. Comments
+    and string literals are ignored.
+    Returns None when the contract needs a full LLM classification.
+    """
+    if RISKY.search(code):
+        return None
+    code = blank_inert(code)
+    for m in BALANCE_REQ.finditer(code):
+        scope = _unconditional_scope(code, m.start())
+        if scope is not None:
+            break
+    else:
+        return None
+    mapping, slot, amount = (re.escape(g) for g in m.groups())
+    entry = rf"{mapping}\s*\[\s*{slot}\s*\]"
+    # The statement must end right after the amount, so `-= amount / 2` does not qualify.
+    debits = list(re.finditer(
+        rf"{entry}\s*(?:-=\s*{amount}|=\s*{entry}\s*(?:-\s*{amount}|\.sub\(\s*{amount}\s*\)))\s*;", code))
+    credits = list(re.finditer(
+        rf"{mapping}\s*\[\s*([^\]]+?)\s*\]\s*(?:\+=\s*{amount}"
+        rf"|=\s*{mapping}\s*\[\s*\1\s*\]\s*(?:\+\s*{amount}|\.add\(\s*{amount}\s*\)))\s*;",
+        code))
+    if len(debits) != 1 or len(credits) != 1 or debits[0].start() < m.end():
+        return None
+    # Crediting the debited slot (e.g. back to msg.sender) moves nothing
+    if re.sub(r"\s+", "", credits[0].group(1)) == re.sub(r"\s+", "", m.group(2)):
+        return None
+    if any(_unconditional_scope(code, x.start()) != scope for x in (debits[0], credits[0])):
+        return None
+    cite = code.count("\n", 0, m.start()) + 1
+    return {
+        "status": "safe",
+        "citation_line": cite,
+        "explanation": (
+            f"Heuristic prescreen: require(... >= ...) on line {cite} guards the debited balance, "
+            "which is debited and credited exactly once."
+        )
+    }
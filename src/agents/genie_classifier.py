@@ -3,12 +3,17 @@ Genie worksheet-based classifier.
 Loads worksheet template and uses it to structure LLM reasoning.
 """
 import os
+import re
+import asyncio
 import openai
 import csv
-from typing import List, Dict, Any
+import functools
+from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
-from src.utils.io import read_csv, write_csv, write_json
-from src.pipeline.inference_metrics import compute
+from src.utils import llm_cache
+from src.utils.ratelimiter import get_limiter
+from src.utils.openai_client import RETRYABLE_ERRORS, make_client, make_async_client
+from src.pipeline.inference import run_inference_async
 
 load_dotenv()
 
@@ -19,67 +24,116 @@ if not OPENAI_API_KEY:
 # Use a smaller OpenAI model by default; override via OPENAI_MODEL if desired.
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
+# Routes requests that share the worksheet prefix to the same cache-warm backend.
+PROMPT_CACHE_KEY = "genie-worksheet-v1"
+
+# Shared clients so every call reuses one HTTP connection pool.
+_CLIENT = make_client(OPENAI_API_KEY)
+_ASYNC_CLIENT = make_async_client(OPENAI_API_KEY)
+
 
 WORKSHEET_TEMPLATE_PATH = "genie/worksheet_template.csv"
 
+# Prompt token usage across classify_with_genie* calls in this process.
+_PROMPT_CACHE_STATS = {"prompt_tokens": 0, "cached_tokens": 0}
 
+
+@functools.lru_cache(maxsize=1)
 def load_worksheet_template(path: str) -> List[Dict[str, Any]]:
-    """Load the genie worksheet template CSV."""
+    """Load the genie worksheet template CSV (parsed once per process; do not mutate)."""
     with open(path, "r", newline="") as f:
         return list(csv.DictReader(f))
 
 
+# Static worksheet instructions, sent as the system message. Built once so the
+# prefix is byte-identical on every call and eligible for OpenAI's automatic
+# prompt caching; only the contract code varies per request.
+_WORKSHEET_PREFIX = "\n".join([
+    "You are analyzing a Solidity contract for safety using a structured worksheet approach.",
+    "The contract code to analyze is provided in the user message.",
+    "",
+    "SAFETY CHECK WORKSHEET:",
+    "",
+    "1. BALANCE SAFETY CHECK",
+    "   - Check if balance is verified before transfer using require(balance >= amount) pattern",
+    "   - Identify line numbers or code snippets showing the balance check",
+    "",
+    "2. ARITHMETIC SAFETY CHECK",
+    "   - Check for arithmetic overflow/underflow risks in calculations",
+    "   - Identify evidence of arithmetic safety issues or protections",
+    "",
+    "3. ACCESS CONTROL CHECK",
+    "   - Check for proper access control (e.g., only owner can call, proper modifiers)",
+    "   - Identify evidence of access control mechanisms or lack thereof",
+    "",
+    "4. INPUT VALIDATION CHECK",
+    "   - Check if inputs are validated (non-zero addresses, positive amounts, etc.)",
+    "   - Identify evidence of input validation or missing validation",
+    "",
+    "5. STATE CONSISTENCY CHECK",
+    "   - Check if state updates are consistent (balances updated correctly, no double-spending)",
+    "   - Identify evidence of state consistency or inconsistency issues",
+    "",
+    "OUTPUT FORMAT:",
+    "FIRST, you MUST output a single line exactly in one of these forms:",
+    "DECISION: SAFE",
+    "or",
+    "DECISION: UNSAFE",
+    "",
+    "Immediately after that, provide your analysis in the following structured format:",
+    "BALANCE_CHECK: [true/false] - [evidence or explanation]",
+    "ARITHMETIC_SAFETY: [true/false] - [evidence or explanation]",
+    "ACCESS_CONTROL: [true/false] - [evidence or explanation]",
+    "INPUT_VALIDATION: [true/false] - [evidence or explanation]",
+    "STATE_CONSISTENCY: [true/false] - [evidence or explanation]",
+    "",
+    "REASONING: [Detailed explanation of your analysis]"
+])
+
+
+# Fence around the contract code in the user message.
+_CODE_PREFIX = "```solidity\n"
+_CODE_SUFFIX = "\n```"
+
+
 def build_worksheet_prompt(worksheet_rows: List[Dict], contract_code: str) -> str:
-    """Build a structured prompt from the worksheet template and contract code."""
-    prompt_parts = [
-        "You are analyzing a Solidity contract for safety using a structured worksheet approach.",
-        "",
-        "CONTRACT CODE TO ANALYZE:",
-        "```solidity",
-        contract_code,
-        "```",
-        "",
-        "SAFETY CHECK WORKSHEET:",
-        "",
-        "1. BALANCE SAFETY CHECK",
-        "   - Check if balance is verified before transfer using require(balance >= amount) pattern",
-        "   - Identify line numbers or code snippets showing the balance check",
-        "",
-        "2. ARITHMETIC SAFETY CHECK",
-        "   - Check for arithmetic overflow/underflow risks in calculations",
-        "   - Identify evidence of arithmetic safety issues or protections",
-        "",
-        "3. ACCESS CONTROL CHECK",
-        "   - Check for proper access control (e.g., only owner can call, proper modifiers)",
-        "   - Identify evidence of access control mechanisms or lack thereof",
-        "",
-        "4. INPUT VALIDATION CHECK",
-        "   - Check if inputs are validated (non-zero addresses, positive amounts, etc.)",
-        "   - Identify evidence of input validation or missing validation",
-        "",
-        "5. STATE CONSISTENCY CHECK",
-        "   - Check if state updates are consistent (balances updated correctly, no double-spending)",
-        "   - Identify evidence of state consistency or inconsistency issues",
-        "",
-        "OUTPUT FORMAT:",
-        "FIRST, you MUST output a single line exactly in one of these forms:",
-        "DECISION: SAFE",
-        "or",
-        "DECISION: UNSAFE",
-        "",
-        "Immediately after that, provide your analysis in the following structured format:",
-        "BALANCE_CHECK: [true/false] - [evidence or explanation]",
-        "ARITHMETIC_SAFETY: [true/false] - [evidence or explanation]",
-        "ACCESS_CONTROL: [true/false] - [evidence or explanation]",
-        "INPUT_VALIDATION: [true/false] - [evidence or explanation]",
-        "STATE_CONSISTENCY: [true/false] - [evidence or explanation]",
-        "",
-        "REASONING: [Detailed explanation of your analysis]",
-        "",
-        "Begin your analysis:"
+    """Build the per-contract user message; the worksheet is sent as the system message."""
+    return _CODE_PREFIX + contract_code + _CODE_SUFFIX
+
+
+def build_worksheet_messages(worksheet_rows: List[Dict], contract_code: str) -> List[Dict]:
+    """Build the chat messages: static worksheet prefix first, contract code last."""
+    return [
+        {"role": "system", "content": _WORKSHEET_PREFIX},
+        {"role": "user", "content": build_worksheet_prompt(worksheet_rows, contract_code)}
     ]
-    
-    return "\n".join(prompt_parts)
+
+
+def _record_cache_usage(response) -> None:
+    """Track how many prompt tokens were served from OpenAI's prompt cache."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    _PROMPT_CACHE_STATS["prompt_tokens"] += usage.prompt_tokens or 0
+    _PROMPT_CACHE_STATS["cached_tokens"] += getattr(details, "cached_tokens", 0) or 0
+
+
+# One line per worksheet field, e.g. "BALANCE_CHECK: true - require(...) on line 2".
+_FIELD_RE = re.compile(
+    r"^[ \t]*((?i:DECISION)|BALANCE_CHECK|ARITHMETIC_SAFETY|ACCESS_CONTROL"
+    r"|INPUT_VALIDATION|STATE_CONSISTENCY|REASONING):[ \t]*(.*)$",
+    re.M
+)
+
+# Worksheet field -> (evidence key, name of its true/false flag)
+_EVIDENCE_FIELDS = {
+    "BALANCE_CHECK": ("balance_check", "has_check"),
+    "ARITHMETIC_SAFETY": ("arithmetic_safety", "safe"),
+    "ACCESS_CONTROL": ("access_control", "has_control"),
+    "INPUT_VALIDATION": ("input_validation", "has_validation"),
+    "STATE_CONSISTENCY": ("state_consistency", "consistent"),
+}
 
 
 def parse_genie_response(response: str) -> Dict:
@@ -90,150 +144,155 @@ def parse_genie_response(response: str) -> Dict:
         "evidence": {},
         "evidence_summary": ""
     }
-    
-    lines = response.split("\n")
-    current_section = None
-    reasoning_lines = []
-    decision_found = False
-
-    # 1) Try to read first non-empty line as explicit DECISION.
-    for idx, raw_line in enumerate(lines):
-        line = raw_line.strip()
-        if not line:
-            continue
-        upper = line.upper()
-        if upper.startswith("DECISION:"):
-            decision_text = upper.split(":", 1)[1].strip()
-            if "UNSAFE" in decision_text:
-                result["status"] = "unsafe"
-            elif "SAFE" in decision_text:
-                result["status"] = "safe"
-            decision_found = True
-            # Reasoning starts after the decision line
-            lines = lines[idx + 1 :]
-            break
-
-    # 2) Parse remaining lines for worksheet sections and reasoning.
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Parse structured fields
-        if line.startswith("BALANCE_CHECK:"):
-            parts = line.split(":", 1)[1].strip().split(" - ", 1)
-            result["evidence"]["balance_check"] = {
-                "has_check": "true" in parts[0].lower() if parts else False,
-                "evidence": parts[1] if len(parts) > 1 else ""
-            }
-        elif line.startswith("ARITHMETIC_SAFETY:"):
-            parts = line.split(":", 1)[1].strip().split(" - ", 1)
-            result["evidence"]["arithmetic_safety"] = {
-                "safe": "true" in parts[0].lower() if parts else False,
-                "evidence": parts[1] if len(parts) > 1 else ""
-            }
-        elif line.startswith("ACCESS_CONTROL:"):
-            parts = line.split(":", 1)[1].strip().split(" - ", 1)
-            result["evidence"]["access_control"] = {
-                "has_control": "true" in parts[0].lower() if parts else False,
-                "evidence": parts[1] if len(parts) > 1 else ""
-            }
-        elif line.startswith("INPUT_VALIDATION:"):
-            parts = line.split(":", 1)[1].strip().split(" - ", 1)
-            result["evidence"]["input_validation"] = {
-                "has_validation": "true" in parts[0].lower() if parts else False,
-                "evidence": parts[1] if len(parts) > 1 else ""
-            }
-        elif line.startswith("STATE_CONSISTENCY:"):
-            parts = line.split(":", 1)[1].strip().split(" - ", 1)
-            result["evidence"]["state_consistency"] = {
-                "consistent": "true" in parts[0].lower() if parts else False,
-                "evidence": parts[1] if len(parts) > 1 else ""
+
+    decision = None
+    reasoning_parts = []
+    matches = list(_FIELD_RE.finditer(response))
+
+    for i, m in enumerate(matches):
+        field, value = m.group(1).upper(), m.group(2).strip()
+        if field == "DECISION":
+            # The first DECISION line wins
+            if decision is None:
+                decision = value.upper()
+        elif field == "REASONING":
+            # Reasoning runs until the next worksheet field (or the end of the response)
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(response)
+            reasoning_parts.append(" ".join((value + response[m.end():end]).split()))
+        else:
+            key, flag = _EVIDENCE_FIELDS[field]
+            flag_text, _, evidence = value.partition(" - ")
+            result["evidence"][key] = {
+                flag: "true" in flag_text.lower(),
+                "evidence": evidence
             }
-        elif line.startswith("REASONING:"):
-            current_section = "reasoning"
-            reasoning_lines.append(line.split(":", 1)[1].strip() if ":" in line else "")
-        elif line.startswith("DECISION:"):
-            decision_text = line.split(":", 1)[1].strip().upper() if ":" in line else line.upper()
-            result["status"] = "safe" if "SAFE" in decision_text else "unsafe"
-            decision_found = True
-        elif current_section == "reasoning":
-            reasoning_lines.append(line)
-    
-    result["reasoning"] = " ".join(reasoning_lines) if reasoning_lines else response
+
+    result["reasoning"] = " ".join(reasoning_parts) if reasoning_parts else response
     result["evidence_summary"] = "; ".join([
         f"{k}: {v.get('evidence', '')[:50]}" 
         for k, v in result["evidence"].items() 
         if isinstance(v, dict) and "evidence" in v
     ])
-    
-    # If no structured parsing worked, try to extract decision from response
-    if not decision_found:
+
+    if decision is not None:
+        if "UNSAFE" in decision:
+            result["status"] = "unsafe"
+        elif "SAFE" in decision:
+            result["status"] = "safe"
+    else:
+        # No structured decision: fall back to scanning the free-form response
         response_upper = response.upper()
         if "SAFE" in response_upper and "UNSAFE" not in response_upper:
             result["status"] = "safe"
-        elif "UNSAFE" in response_upper:
-            result["status"] = "unsafe"
         result["reasoning"] = response
     
     return result
 
 
+def _cache_key(code: str) -> str:
+    return llm_cache.make_key(OPENAI_MODEL, _WORKSHEET_PREFIX, llm_cache.canonicalize_code(code))
+
+
 def classify_with_genie(worksheet_rows: List[Dict], code: str) -> Dict:
     """Classify a contract using genie worksheet approach."""
+    key = _cache_key(code)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
     try:
-        prompt = build_worksheet_prompt(worksheet_rows, code)
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
+        response = _CLIENT.chat.completions.create(
             model=OPENAI_MODEL,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
+            messages=build_worksheet_messages(worksheet_rows, code),
             temperature=0.0,
-            max_tokens=1000
+            max_tokens=1000,
+            prompt_cache_key=PROMPT_CACHE_KEY
         )
-        response_text = response.choices[0].message.content.strip()
+        _record_cache_usage(response)
+        response_text = (response.choices[0].message.content or "").strip()
         parsed = parse_genie_response(response_text)
+        llm_cache.put(key, parsed)
         return parsed
-    except Exception as e:
+    except RETRYABLE_ERRORS as e:
         print(f"Genie classification error: {e}")
         return {
             "status": "unsafe",
             "reasoning": f"Error during classification: {e}",
             "evidence": {},
-            "evidence_summary": ""
+            "evidence_summary": "",
+            "error": True
         }
 
 
-def run_genie_inference(input_csv: str, worksheet_path: str, output_csv: str, metrics_json: str):
-    """Run genie worksheet-based inference on labeled contracts."""
+async def classify_with_genie_async(
+    client: openai.AsyncOpenAI, worksheet_rows: List[Dict], code: str
+) -> Dict:
+    """Async variant of classify_with_genie() for concurrent inference runs."""
+    key = _cache_key(code)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+    try:
+        messages = build_worksheet_messages(worksheet_rows, code)
+        prompt_chars = sum(len(m["content"]) for m in messages)
+        await get_limiter().acquire(estimated_tokens=prompt_chars // 4 + 1000)
+        response = await client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=messages,
+            temperature=0.0,
+            max_tokens=1000,
+            prompt_cache_key=PROMPT_CACHE_KEY
+        )
+        _record_cache_usage(response)
+        response_text = (response.choices[0].message.content or "").strip()
+        parsed = parse_genie_response(response_text)
+        llm_cache.put(key, parsed)
+        return parsed
+    except RETRYABLE_ERRORS as e:
+        print(f"Genie classification error: {e}")
+        return {
+            "status": "unsafe",
+            "reasoning": f"Error during classification: {e}",
+            "evidence": {},
+            "evidence_summary": "",
+            "error": True
+        }
+
+
+async def run_genie_inference_async(
+    input_csv: str,
+    worksheet_path: str,
+    output_csv: str,
+    metrics_json: str,
+    client: Optional[openai.AsyncOpenAI] = None,
+    sem: Optional[asyncio.Semaphore] = None
+):
+    """
+    Stream labeled contracts through the genie worksheet classifier (see
+    run_inference_async). Pass a shared client and semaphore to run alongside
+    other inference tasks.
+    """
     worksheet_rows = load_worksheet_template(worksheet_path)
-    rows = read_csv(input_csv)
-    results = []
-    
-    for i, row in enumerate(rows):
-        print(f"Genie inference {i+1}/{len(rows)}...")
-        code = row["code"]
-        result = classify_with_genie(worksheet_rows, code)
-        results.append({
-            "id": row["id"],
-            "gold_label": row["final_label"],
-            "agent_status": result["status"],
-            "reasoning": result["reasoning"],
-            "evidence_summary": result["evidence_summary"]
-        })
-    
-    write_csv(
-        output_csv,
-        results,
-        fieldnames=["id", "gold_label", "agent_status", "reasoning", "evidence_summary"]
+    client = client or _ASYNC_CLIENT
+    await run_inference_async(
+        "Genie", input_csv, output_csv, metrics_json,
+        classify=lambda code: classify_with_genie_async(client, worksheet_rows, code),
+        columns=["reasoning", "evidence_summary"],
+        sem=sem,
+        from_prescreen=lambda screened: {
+            "status": screened["status"],
+            "reasoning": screened["explanation"],
+            "evidence_summary": f"balance_check: line {screened['citation_line']}"
+        }
     )
-    
-    metrics = compute(output_csv)
-    write_json(metrics_json, metrics)
-    
-    print(f"Genie inference complete. Saved to {output_csv}")
-    print(f"Metrics saved to {metrics_json}")
+    print(
+        f"Prompt cache: {_PROMPT_CACHE_STATS['cached_tokens']}/"
+        f"{_PROMPT_CACHE_STATS['prompt_tokens']} prompt tokens served from cache"
+    )
+
+
+def run_genie_inference(input_csv: str, worksheet_path: str, output_csv: str, metrics_json: str):
+    """Run genie worksheet-based inference on labeled contracts."""
+    asyncio.run(run_genie_inference_async(input_csv, worksheet_path, output_csv, metrics_json))
 
 
 if __name__ == "__main__":
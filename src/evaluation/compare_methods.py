@@ -2,33 +2,28 @@
 Evaluation module.
 Compares Baseline vs Gold, Genie vs Gold, and Genie vs Baseline.
 """
-from typing import Dict
-from src.utils.io import read_csv, write_json
+from collections import Counter
+from typing import Dict, List, Tuple, Union
+from src.utils.io import read_columns, write_json
+from src.pipeline.inference_metrics import count_confusion, summarize
 
 
-def compute_comparison_metrics(predicted_csv: str, gold_label_col: str, predicted_col: str) -> Dict:
-    """Compute metrics comparing predictions to gold labels."""
-    rows = read_csv(predicted_csv)
-    n = len(rows)
-    
-    tp = sum(1 for r in rows if r[predicted_col] == "safe" and r[gold_label_col] == "safe")
-    tn = sum(1 for r in rows if r[predicted_col] == "unsafe" and r[gold_label_col] == "unsafe")
-    fp = sum(1 for r in rows if r[predicted_col] == "safe" and r[gold_label_col] == "unsafe")
-    fn = sum(1 for r in rows if r[predicted_col] == "unsafe" and r[gold_label_col] == "safe")
-    
-    acc = (tp + tn) / max(1, n)
-    prec = tp / max(1, (tp + fp))
-    rec = tp / max(1, (tp + fn))
-    f1 = (2 * prec * rec) / max(1e-9, (prec + rec))
-    
-    return {
-        "n_examples": n,
-        "accuracy": round(acc, 3),
-        "precision_safe": round(prec, 3),
-        "recall_safe": round(rec, 3),
-        "f1_safe": round(f1, 3),
-        "confusion_matrix": {"tp": tp, "tn": tn, "fp": fp, "fn": fn}
-    }
+def _metrics_from_pairs(pairs: List[Tuple[str, str]]) -> Dict:
+    """Metrics over (predicted, gold) label pairs."""
+    metrics = summarize(count_confusion(pairs), len(pairs))
+    metrics["confusion_matrix"] = metrics.pop("confusion")
+    return metrics
+
+
+def compute_comparison_metrics(
+    predicted: Union[str, List[Dict]], gold_label_col: str, predicted_col: str
+) -> Dict:
+    """Compute metrics comparing predictions to gold labels (CSV path or loaded rows)."""
+    if isinstance(predicted, str):
+        pairs = list(read_columns(predicted, [predicted_col, gold_label_col]))
+    else:
+        pairs = [(r[predicted_col], r[gold_label_col]) for r in predicted]
+    return _metrics_from_pairs(pairs)
 
 
 def compare_methods(
@@ -37,48 +32,35 @@ def compare_methods(
     gold_label_col: str = "gold_label"
 ) -> Dict:
     """Compare baseline and genie methods against gold labels and each other."""
+    # Read only the columns needed, once per CSV, and reuse them for every comparison
+    columns = ["id", "agent_status", gold_label_col]
+    baseline = list(read_columns(baseline_csv, columns))
+    genie = list(read_columns(genie_csv, columns))
+
     # Baseline vs Gold
-    baseline_vs_gold = compute_comparison_metrics(
-        baseline_csv, gold_label_col, "agent_status"
-    )
-    
+    baseline_vs_gold = _metrics_from_pairs([(status, gold) for _, status, gold in baseline])
+
     # Genie vs Gold
-    genie_vs_gold = compute_comparison_metrics(
-        genie_csv, gold_label_col, "agent_status"
+    genie_vs_gold = _metrics_from_pairs([(status, gold) for _, status, gold in genie])
+
+    # Genie vs Baseline (treat baseline as "gold" for comparison):
+    # join on id and count (baseline_status, genie_status) pairs in one pass
+    baseline_status = {id_val: status for id_val, status, _ in baseline}
+    genie_status = {id_val: status for id_val, status, _ in genie}
+    merged = Counter(
+        (status, genie_status[id_val])
+        for id_val, status in baseline_status.items()
+        if id_val in genie_status
     )
-    
-    # Genie vs Baseline (treat baseline as "gold" for comparison)
-    # Need to merge the two CSVs first
-    baseline_rows = {r["id"]: r for r in read_csv(baseline_csv)}
-    genie_rows = {r["id"]: r for r in read_csv(genie_csv)}
-    
-    # Create merged comparison
-    merged = []
-    for id_val in baseline_rows.keys():
-        if id_val in genie_rows:
-            merged.append({
-                "id": id_val,
-                "baseline_status": baseline_rows[id_val]["agent_status"],
-                "genie_status": genie_rows[id_val]["agent_status"]
-            })
-    
+
     # Compute agreement metrics
-    n_merged = len(merged)
-    agree = sum(1 for r in merged if r["baseline_status"] == r["genie_status"])
-    baseline_safe_genie_unsafe = sum(
-        1 for r in merged 
-        if r["baseline_status"] == "safe" and r["genie_status"] == "unsafe"
-    )
-    baseline_unsafe_genie_safe = sum(
-        1 for r in merged 
-        if r["baseline_status"] == "unsafe" and r["genie_status"] == "safe"
-    )
-    
+    n_merged = sum(merged.values())
+    agree = sum(count for (b, g), count in merged.items() if b == g)
     genie_vs_baseline = {
         "n_examples": n_merged,
         "agreement_rate": round(agree / max(1, n_merged), 3),
-        "baseline_safe_genie_unsafe": baseline_safe_genie_unsafe,
-        "baseline_unsafe_genie_safe": baseline_unsafe_genie_safe,
+        "baseline_safe_genie_unsafe": merged[("safe", "unsafe")],
+        "baseline_unsafe_genie_safe": merged[("unsafe", "safe")],
         "disagreement_rate": round((n_merged - agree) / max(1, n_merged), 3)
     }
     
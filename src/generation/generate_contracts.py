@@ -3,10 +3,12 @@ Contract generation module.
 Generates 250 Solidity-like contract snippets using GPT.
 """
 import os
-import openai
+import orjson
+import time
 from typing import List, Dict
 from dotenv import load_dotenv
 from src.utils.io import write_csv
+from src.utils.openai_client import RETRYABLE_ERRORS, make_client
 
 load_dotenv()
 
@@ -17,6 +19,12 @@ if not OPENAI_API_KEY:
 # Use a smaller OpenAI model by default; override via OPENAI_MODEL if desired.
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
+# Routes requests that share the system prompt to the same cache-warm backend.
+PROMPT_CACHE_KEY = "contract-generation-v1"
+
+# Shared client so every call reuses one HTTP connection pool.
+_CLIENT = make_client(OPENAI_API_KEY)
+
 
 SYSTEM_PROMPT = """You are a Solidity contract generator. Generate realistic ERC20-like transfer function snippets.
 Include variations in:
@@ -48,49 +56,127 @@ VARIATION_TYPES = [
     "unsafe with wrong variable in check",
 ] * 25  # 10 types * 25 = 250 contracts
 
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_POLL_INTERVAL_S = 30
+BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def _chat_request_body(variation_type: str) -> Dict:
+    """Chat completion request body for a single contract."""
+    return {
+        "model": OPENAI_MODEL,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": USER_PROMPT_TEMPLATE.format(variation_type=variation_type)}
+        ],
+        "temperature": 0.8,
+        "max_tokens": 300,
+        "prompt_cache_key": PROMPT_CACHE_KEY
+    }
+
+
+def _strip_code_fence(code: str) -> str:
+    """Remove markdown code blocks if present."""
+    code = code.strip()
+    if code.startswith("```"):
+        lines = code.split("\n")
+        code = "\n".join(lines[1:-1]) if lines[-1].strip() == "```" else "\n".join(lines[1:])
+    return code
+
+
+def _fallback_contract(contract_id: int) -> str:
+    """Simple template used when generation fails."""
+    return f"// Contract {contract_id}\nfunction transfer(address to, uint256 amount) public {{\n    // Generated code\n}}"
+
 
 def generate_contract(variation_type: str, contract_id: int) -> str:
     """Generate a single contract snippet using GPT."""
     try:
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": USER_PROMPT_TEMPLATE.format(variation_type=variation_type)}
-            ],
-            temperature=0.8,
-            max_tokens=300
-        )
-        code = response.choices[0].message.content.strip()
-        # Remove markdown code blocks if present
-        if code.startswith("```"):
-            lines = code.split("\n")
-            code = "\n".join(lines[1:-1]) if lines[-1].strip() == "```" else "\n".join(lines[1:])
-        return code
-    except Exception as e:
+        response = _CLIENT.chat.completions.create(**_chat_request_body(variation_type))
+        return _strip_code_fence(response.choices[0].message.content or "")
+    except RETRYABLE_ERRORS as e:
         print(f"Error generating contract {contract_id}: {e}")
-        # Fallback to a simple template
-        return f"// Contract {contract_id}\nfunction transfer(address to, uint256 amount) public {{\n    // Generated code\n}}"
+        return _fallback_contract(contract_id)
+
+
+def parse_batch_output(output: str) -> Dict[int, str]:
+    """
+    Map custom_id -> contract code from a batch output JSONL file.
+    Failed items and replies without content (e.g. refusals) are left out so
+    they are regenerated directly.
+    """
+    codes: Dict[int, str] = {}
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        item = orjson.loads(line)
+        response = item.get("response") or {}
+        if response.get("status_code") != 200:
+            continue
+        content = response["body"]["choices"][0]["message"].get("content")
+        if content:
+            codes[int(item["custom_id"])] = _strip_code_fence(content)
+    return codes
+
+
+def generate_contracts_batch(variation_types: List[str]) -> List[str]:
+    """
+    Generate contracts through the OpenAI Batch API.
+    Submits every prompt as one JSONL batch job, polls until it finishes and
+    falls back to generate_contract() for any item the batch did not return.
+    """
+    payload = b"\n".join(
+        orjson.dumps({
+            "custom_id": str(i),
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": _chat_request_body(variation)
+        })
+        for i, variation in enumerate(variation_types)
+    )
+    batch_file = _CLIENT.files.create(
+        file=("contracts_batch.jsonl", payload),
+        purpose="batch"
+    )
+    batch = _CLIENT.batches.create(
+        input_file_id=batch_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h"
+    )
+    print(f"Submitted batch {batch.id} with {len(variation_types)} requests.")
+
+    while batch.status not in BATCH_TERMINAL_STATUSES:
+        time.sleep(BATCH_POLL_INTERVAL_S)
+        batch = _CLIENT.batches.retrieve(batch.id)
+        counts = batch.request_counts
+        done = f" ({counts.completed}/{counts.total})" if counts else ""
+        print(f"Batch {batch.id}: {batch.status}{done}")
+
+    # Expired or cancelled batches still keep the results that finished in time
+    codes: Dict[int, str] = {}
+    if batch.output_file_id:
+        codes = parse_batch_output(_CLIENT.files.content(batch.output_file_id).text)
+    if batch.status != "completed":
+        print(f"Batch {batch.id} ended with status {batch.status} ({len(codes)} results).")
+
+    contracts = []
+    for i, variation in enumerate(variation_types):
+        if i not in codes:
+            print(f"Batch missing contract {i}, generating it directly...")
+            codes[i] = generate_contract(variation, i)
+        contracts.append(codes[i])
+    return contracts
 
 
 def generate_all_contracts(output_path: str = "data/contracts_raw.csv"):
     """Generate 250 contract snippets and save to CSV."""
     print("Generating 250 contract snippets...")
-    contracts = []
-    
-    for i, variation in enumerate(VARIATION_TYPES):
-        print(f"Generating contract {i+1}/250...")
-        code = generate_contract(variation, i)
-        contracts.append({
-            "id": str(i),
-            "code": code
-        })
-    
+    codes = generate_contracts_batch(VARIATION_TYPES)
+    contracts = [{"id": str(i), "code": code} for i, code in enumerate(codes)]
+
     write_csv(output_path, contracts, fieldnames=["id", "code"])
     print(f"Generated {len(contracts)} contracts. Saved to {output_path}")
 
 
 if __name__ == "__main__":
     generate_all_contracts()
-
@@ -0,0 +1,88 @@
+"""
+Shared driver for the baseline and genie inference runs.
+Streams labeled contracts through a classifier, writes predictions in input
+order and accumulates the confusion counts for the metrics on the fly.
+"""
+import os
+import asyncio
+import hashlib
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+from src.agents.genie_agent import prescreen
+from src.pipeline.inference_metrics import summarize
+from src.utils.concurrency import map_ordered
+from src.utils.io import iter_csv, csv_writer, write_json
+from src.utils.openai_client import OPENAI_CONCURRENCY
+
+load_dotenv()
+
+# Let the deterministic genie_agent.prescreen() label obviously safe contracts
+# without an LLM call. Off by default so baseline/genie comparisons stay pure LLM.
+INFERENCE_PRESCREEN = os.getenv("INFERENCE_PRESCREEN", "0") == "1"
+
+
+async def run_inference_async(
+    method: str,
+    input_csv: str,
+    output_csv: str,
+    metrics_json: str,
+    classify: Callable[[str], Awaitable[Dict]],
+    columns: List[str],
+    sem: Optional[asyncio.Semaphore] = None,
+    from_prescreen: Callable[[Dict], Dict] = lambda screened: screened
+) -> Dict:
+    """
+    Classify every row of input_csv and write id, gold_label, agent_status, the
+    method's own result `columns` and source to output_csv; returns the metrics.
+    Identical code strings share one classification (and one in-flight call).
+    With INFERENCE_PRESCREEN, prescreened contracts skip `classify`; their
+    verdict is turned into a result with `from_prescreen`.
+    """
+    sem = sem or asyncio.Semaphore(OPENAI_CONCURRENCY)
+
+    async def classify_code(code: str):
+        screened = prescreen(code) if INFERENCE_PRESCREEN else None
+        if screened is not None:
+            return from_prescreen(screened), "heuristic"
+        async with sem:
+            return await classify(code), "llm"
+
+    seen: Dict[bytes, asyncio.Future] = {}
+
+    async def classify_row(row: Dict):
+        code = row["code"]
+        key = hashlib.blake2b(code.encode("utf-8"), digest_size=16).digest()
+        if key not in seen:
+            seen[key] = asyncio.ensure_future(classify_code(code))
+        result, source = await asyncio.shield(seen[key])
+        return row, result, source
+
+    n = 0
+    confusion = Counter()
+    sources = Counter()
+    fieldnames = ["id", "gold_label", "agent_status", *columns, "source"]
+    with csv_writer(output_csv, fieldnames=fieldnames) as writerow:
+        rows = iter_csv(input_csv)
+        async for row, result, source in map_ordered(classify_row, rows, window=2 * OPENAI_CONCURRENCY):
+            n += 1
+            print(f"{method} inference {n}: id={row['id']} -> {result['status']} ({source})")
+            writerow({
+                "id": row["id"],
+                "gold_label": row["final_label"],
+                "agent_status": result["status"],
+                **{column: result[column] for column in columns},
+                "source": source
+            })
+            confusion[(result["status"], row["final_label"])] += 1
+            sources[source] += 1
+
+    metrics = summarize(confusion, n)
+    write_json(metrics_json, metrics)
+
+    print(f"{method} inference complete. Saved to {output_csv}")
+    print(f"Labels by source: {dict(sources)}")
+    if n:
+        print(f"Dedup ratio: {len(seen)}/{n} unique code strings ({len(seen) / n:.2%})")
+    print(f"Metrics saved to {metrics_json}")
+    return metrics
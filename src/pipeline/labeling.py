@@ -3,24 +3,28 @@ from typing import Dict, List
 from src.utils.io import read_csv, write_csv
 
 SAFE_PAT = r"require\s*\(\s*[^)]*>=\s*[^)]*\)"
+SAFE_RE = re.compile(SAFE_PAT)
+WS_RE = re.compile(r"\s+")
 
 def model_a(code: str) -> str:
-    return "safe" if re.search(SAFE_PAT, code) else "unsafe"
+    return "safe" if SAFE_RE.search(code) else "unsafe"
 
 def model_b(code: str) -> str:
-    return "safe" if re.search(SAFE_PAT, re.sub(r"\s+"," ", code)) else "unsafe"
+    return "safe" if SAFE_RE.search(WS_RE.sub(" ", code)) else "unsafe"
 
-def model_c(code: str) -> str:
-    base = "safe" if re.search(SAFE_PAT, code) else "unsafe"
+def _maybe_flip(base: str) -> str:
     return ("unsafe" if base=="safe" else "safe") if random.random() < 0.12 else base
 
+def model_c(code: str) -> str:
+    return _maybe_flip(model_a(code))
+
 def label_batch(rows: List[Dict]) -> List[Dict]:
     out = []
     for r in rows:
         code = r["code"]
         a = model_a(code)
         b = model_b(code)
-        c = model_c(code)
+        c = _maybe_flip(a)  # model_c shares model_a's regex result
         agree = (a == b == c)
         final_label = a if agree else r["label"]  # simulate human resolution
         out.append({
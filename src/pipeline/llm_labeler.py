@@ -3,10 +3,22 @@ Multi-LLM labeling pipeline.
 Sends contracts to GPT (simulating multi-LLM with different prompts/temperatures).
 """
 import os
+import re
+import asyncio
+import functools
+import httpx
 import openai
-from typing import List, Dict
+import orjson
+import tiktoken
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
-from src.utils.io import read_csv, write_csv, write_json
+from src.utils import llm_cache
+from src.utils.concurrency import map_ordered
+from src.utils.ratelimiter import get_limiter
+from src.utils.openai_client import OPENAI_CONCURRENCY, RETRYABLE_ERRORS, make_async_client
+from src.utils.io import iter_csv, csv_writer, write_json
+from src.utils.solidity import blank_inert
+from src.agents.genie_agent import prescreen
 
 load_dotenv()
 
@@ -19,7 +31,34 @@ if not OPENAI_API_KEY:
 # Use a smaller OpenAI model by default; override via OPENAI_MODEL if desired.
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
-LABELING_PROMPT = """Analyze this Solidity transfer function and classify it as SAFE or UNSAFE.
+# Contracts labeled per request; 1 sends one request per contract and labeler.
+LABEL_BATCH_SIZE = int(os.getenv("LABEL_BATCH_SIZE", "10"))
+
+# Label clear-cut contracts locally (see prefilter()) instead of asking the LLMs.
+# Off by default: these rows become gold labels without any LLM check.
+LABEL_PREFILTER = os.getenv("LABEL_PREFILTER", "0") == "1"
+
+# Only ask the third labeler (Gemini) when GPT and Claude disagree; when they
+# agree it is recorded with their label instead of being queried.
+LABEL_TIEBREAK_ONLY = os.getenv("LABEL_TIEBREAK_ONLY", "1") != "0"
+
+# Per-attempt timeout for labeler calls. Labels are a few tokens, so a call
+# running well past typical latency is cut off and retried by the SDK.
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "15"))
+
+# Shared client so every call reuses one HTTP connection pool. Idle connections
+# are kept alive between labeler calls instead of re-doing the TCP+TLS handshake.
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=120)
+_CLIENT = make_async_client(
+    OPENAI_API_KEY,
+    timeout=openai.Timeout(LLM_TIMEOUT_S, connect=5.0),
+    http_options={"limits": _HTTP_LIMITS}
+)
+
+# Shared labeling rubric, sent as the system message on every labeler call.
+# The bytes are identical across calls so OpenAI can serve this prefix from its
+# prompt cache; only the user message (code and per-labeler wording) varies.
+LABELING_SYSTEM_PROMPT = """You are labeling Solidity ERC20-style transfer functions as SAFE or UNSAFE.
 
 CRITICAL: A function is SAFE ONLY if it has ALL of the following:
 1. Checks balance before transferring (require(balance >= amount) or similar)
@@ -27,7 +66,12 @@ CRITICAL: A function is SAFE ONLY if it has ALL of the following:
 3. Input validation (if needed)
 4. State consistency maintained
 
-A function is UNSAFE if it is MISSING the balance check (require statement checking balance >= amount before transfer).
+A function is UNSAFE if it is MISSING the balance check (require statement checking balance >= amount before transfer)."""
+
+# Routes labeler requests that share the system prompt to the same cache-warm backend.
+PROMPT_CACHE_KEY = "labeling-v1"
+
+LABELING_PROMPT = """Analyze this Solidity transfer function and classify it as SAFE or UNSAFE.
 
 Code:
 {code}
@@ -35,90 +79,238 @@ Code:
 IMPORTANT: If you don't see a require() statement checking balance before the transfer, it is UNSAFE.
 Respond with ONLY one word: SAFE or UNSAFE"""
 
+# Appended to LABELING_PROMPT to simulate Claude.
+CLAUDE_PROMPT_SUFFIX = "\n\nConsider the security implications carefully."
+
+# Separate prompt to simulate Gemini.
+GEMINI_LABELING_PROMPT = """Classify this Solidity transfer function as SAFE or UNSAFE:
+
+{code}
+
+CRITICAL: If the function is MISSING a require() statement checking balance before transfer, it is UNSAFE.
+SAFE only if balance check exists. UNSAFE if balance check is missing.
+Respond with ONLY one word: SAFE or UNSAFE"""
+
+
+# Prompt templates split around {code} once, so each call is a plain concatenation.
+_LABELING_PREFIX, _LABELING_SUFFIX = LABELING_PROMPT.split("{code}")
+_CLAUDE_SUFFIX = _LABELING_SUFFIX + CLAUDE_PROMPT_SUFFIX
+_GEMINI_PREFIX, _GEMINI_SUFFIX = GEMINI_LABELING_PROMPT.split("{code}")
+
+
+def _normalize_label(reply: str) -> str:
+    """Map a one-word labeler reply to safe/unsafe; anything unclear is unsafe."""
+    label = reply.strip().upper()
+    # Replies normally start with the verdict; check that before scanning.
+    if label.startswith("UNSAFE"):
+        return "unsafe"
+    if label.startswith("SAFE"):
+        return "safe"
+    # Check for UNSAFE first (more specific), then SAFE, default to unsafe
+    if "UNSAFE" in label:
+        return "unsafe"
+    if "SAFE" in label:
+        return "safe"
+    return "unsafe"
+
+
+@functools.lru_cache(maxsize=1)
+def _verdict_tokens() -> Optional[Tuple[Dict[str, int], Dict[str, str]]]:
+    """
+    Token-level constraint for single-contract replies: a logit_bias that only
+    allows the first tokens of SAFE and UNSAFE, and a map from each token's
+    text back to its label. None when OPENAI_MODEL's encoding is unknown to
+    tiktoken or can't be loaded; labelers then fall back to free-form replies.
+    The first call may download the encoding, so run_async resolves it off the
+    event loop before any labeler runs.
+    """
+    # KeyError for unknown models; OSError (requests' errors included) and
+    # ValueError (hash mismatch) when the BPE file can't be downloaded or read.
+    try:
+        encoding = tiktoken.encoding_for_model(OPENAI_MODEL)
+        safe, unsafe = encoding.encode("SAFE")[0], encoding.encode("UNSAFE")[0]
+    except (KeyError, OSError, ValueError) as e:
+        print(f"Constrained labeling unavailable for {OPENAI_MODEL}: {e}")
+        return None
+    if safe == unsafe:
+        return None
+    logit_bias = {str(safe): 100, str(unsafe): 100}
+    return logit_bias, {encoding.decode([safe]): "safe", encoding.decode([unsafe]): "unsafe"}
+
+
+def _verdict_kwargs() -> Dict[str, Any]:
+    """Request options for a single-contract verdict: one biased token if possible."""
+    tokens = _verdict_tokens()
+    if tokens is None:
+        return {"max_tokens": 10}
+    return {"max_tokens": 1, "logit_bias": tokens[0]}
 
-def label_with_gpt(code: str) -> str:
+
+def _parse_verdict(reply: str) -> str:
+    """Map a single-contract reply (one constrained token or free text) to a label."""
+    tokens = _verdict_tokens()
+    if tokens is not None and reply.strip() in tokens[1]:
+        return tokens[1][reply.strip()]
+    return _normalize_label(reply)
+
+
+def _labeling_messages(prompt: str) -> List[Dict]:
+    """Shared rubric first, per-labeler prompt last."""
+    return [
+        {"role": "system", "content": LABELING_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+async def _create_completion(prompt: str, **kwargs):
+    """
+    Send one labeler request through the shared rate limiter.
+    The SDK retries 429s and 5xx (honouring Retry-After) with exponential
+    backoff; each 429 also shrinks the limiter's budget (see make_async_client).
+    """
+    messages = _labeling_messages(prompt)
+    prompt_chars = sum(len(m["content"]) for m in messages)
+    await get_limiter().acquire(estimated_tokens=prompt_chars // 4 + kwargs["max_tokens"])
+    return await _CLIENT.chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=messages,
+        prompt_cache_key=PROMPT_CACHE_KEY,
+        **kwargs
+    )
+
+
+def _label_cache_key(labeler: str, code: str) -> str:
+    # Keyed on every labeling prompt, so editing any of them invalidates cached labels.
+    return llm_cache.make_key(
+        OPENAI_MODEL, labeler, LABELING_SYSTEM_PROMPT, LABELING_PROMPT, CLAUDE_PROMPT_SUFFIX,
+        GEMINI_LABELING_PROMPT, BATCH_LABELING_PROMPT, GEMINI_BATCH_LABELING_PROMPT,
+        llm_cache.canonicalize_code(code)
+    )
+
+
+async def label_with_gpt(code: str) -> Optional[str]:
     """Label contract using GPT."""
+    key = _label_cache_key("gpt", code)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
     try:
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "user", "content": LABELING_PROMPT.format(code=code)}
-            ],
+        response = await _create_completion(
+            _LABELING_PREFIX + code + _LABELING_SUFFIX,
             temperature=0.0,
-            max_tokens=10
+            **_verdict_kwargs()
         )
-        label = response.choices[0].message.content.strip().upper()
-        # Check for UNSAFE first (more specific), then SAFE, default to unsafe
-        if "UNSAFE" in label:
-            return "unsafe"
-        elif "SAFE" in label:
-            return "safe"
-        else:
-            # Default to unsafe if unclear
-            return "unsafe"
-    except Exception as e:
+        result = _parse_verdict(response.choices[0].message.content or "")
+        llm_cache.put(key, result)
+        return result
+    except RETRYABLE_ERRORS as e:
         print(f"GPT labeling error: {e}")
-        return "unsafe"  # Default to unsafe on error
+        return None  # No verdict once retries are exhausted; see _labeled_row
 
 
-def label_with_claude(code: str) -> str:
+async def label_with_claude(code: str) -> Optional[str]:
     """Label contract using GPT (simulating Claude with different prompt)."""
+    key = _label_cache_key("claude", code)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
     try:
         # Use slightly different prompt to simulate different model
-        prompt = LABELING_PROMPT.format(code=code) + "\n\nConsider the security implications carefully."
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
+        prompt = _LABELING_PREFIX + code + _CLAUDE_SUFFIX
+        response = await _create_completion(
+            prompt,
             temperature=0.1,  # Slight variation
-            max_tokens=10
+            **_verdict_kwargs()
         )
-        label = response.choices[0].message.content.strip().upper()
-        # Check for UNSAFE first (more specific), then SAFE, default to unsafe
-        if "UNSAFE" in label:
-            return "unsafe"
-        elif "SAFE" in label:
-            return "safe"
-        else:
-            # Default to unsafe if unclear
-            return "unsafe"
-    except Exception as e:
+        result = _parse_verdict(response.choices[0].message.content or "")
+        llm_cache.put(key, result)
+        return result
+    except RETRYABLE_ERRORS as e:
         print(f"Claude (GPT) labeling error: {e}")
-        return "unsafe"  # Default to unsafe on error
+        return None  # No verdict once retries are exhausted; see _labeled_row
 
 
-def label_with_gemini(code: str) -> str:
+async def label_with_gemini(code: str) -> Optional[str]:
     """Label contract using GPT (simulating Gemini with different prompt)."""
+    key = _label_cache_key("gemini", code)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
     try:
         # Use slightly different prompt to simulate different model
-        prompt = "Classify this Solidity transfer function as SAFE or UNSAFE:\n\n" + code + "\n\n" + \
-                 "CRITICAL: If the function is MISSING a require() statement checking balance before transfer, it is UNSAFE.\n" + \
-                 "SAFE only if balance check exists. UNSAFE if balance check is missing.\n" + \
-                 "Respond with ONLY one word: SAFE or UNSAFE"
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
+        prompt = _GEMINI_PREFIX + code + _GEMINI_SUFFIX
+        response = await _create_completion(
+            prompt,
             temperature=0.2,  # Slight variation
-            max_tokens=10
+            **_verdict_kwargs()
         )
-        label = response.choices[0].message.content.strip().upper()
-        # Check for UNSAFE first (more specific), then SAFE, default to unsafe
-        if "UNSAFE" in label:
-            return "unsafe"
-        elif "SAFE" in label:
-            return "safe"
-        else:
-            # Default to unsafe if unclear
-            return "unsafe"
-    except Exception as e:
+        result = _parse_verdict(response.choices[0].message.content or "")
+        llm_cache.put(key, result)
+        return result
+    except RETRYABLE_ERRORS as e:
         print(f"Gemini (GPT) labeling error: {e}")
-        return "unsafe"  # Default to unsafe on error
+        return None  # No verdict once retries are exhausted; see _labeled_row
+
+
+BATCH_LABELING_PROMPT = """Analyze the following {n} Solidity transfer functions and classify each one as SAFE or UNSAFE.
+
+{contracts}
+
+IMPORTANT: If you don't see a require() statement checking balance before the transfer, it is UNSAFE.{extra}
+Respond with a JSON object {{"labels": [...]}} whose list has exactly {n} entries, each "SAFE" or "UNSAFE", in the order the functions are numbered."""
+
+GEMINI_BATCH_LABELING_PROMPT = """Classify each of these {n} Solidity transfer functions as SAFE or UNSAFE:
+
+{contracts}
+
+CRITICAL: If a function is MISSING a require() statement checking balance before transfer, it is UNSAFE.
+SAFE only if balance check exists. UNSAFE if balance check is missing.
+Respond with a JSON object {{"labels": [...]}} whose list has exactly {n} entries, each "SAFE" or "UNSAFE", in the order the functions are numbered."""
+
+
+def _batch_prompt(labeler: str, codes: List[str]) -> str:
+    """Number the contracts and fill in the batch prompt for one labeler."""
+    contracts = "\n\n".join(f"[{i}]\n{code}" for i, code in enumerate(codes, 1))
+    if labeler == "gemini":
+        return GEMINI_BATCH_LABELING_PROMPT.format(n=len(codes), contracts=contracts)
+    extra = CLAUDE_PROMPT_SUFFIX if labeler == "claude" else ""
+    return BATCH_LABELING_PROMPT.format(n=len(codes), contracts=contracts, extra=extra)
+
+
+def parse_batch_labels(raw: str, n: int) -> Optional[List[str]]:
+    """Parse a {"labels": [...]} reply; None unless it holds exactly n SAFE/UNSAFE entries."""
+    try:
+        labels = orjson.loads(raw)["labels"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    if not isinstance(labels, list) or len(labels) != n:
+        return None
+    parsed = [str(label).strip().upper() for label in labels]
+    if any(label not in ("SAFE", "UNSAFE") for label in parsed):
+        return None
+    return [label.lower() for label in parsed]
+
+
+# Per labeler: single-contract fallback and the temperature it samples at.
+LABELERS = {
+    "gpt": (label_with_gpt, 0.0),
+    "claude": (label_with_claude, 0.1),
+    "gemini": (label_with_gemini, 0.2),
+}
+
+
+async def label_chunk(labeler: str, codes: List[str]) -> Optional[List[str]]:
+    """
+    Label several contracts with one request; None if the reply can't be parsed.
+    API errors propagate, so callers don't retry a rate-limited batch one contract at a time.
+    """
+    response = await _create_completion(
+        _batch_prompt(labeler, codes),
+        temperature=LABELERS[labeler][1],
+        max_tokens=10 * len(codes) + 20,
+        response_format={"type": "json_object"}
+    )
+    return parse_batch_labels(response.choices[0].message.content or "", len(codes))
 
 
 def compute_confidence(gpt_label: str, claude_label: str, gemini_label: str) -> float:
@@ -128,71 +320,215 @@ def compute_confidence(gpt_label: str, claude_label: str, gemini_label: str) ->
     return round(agreement_count / 3.0, 2)
 
 
-def label_batch(rows: List[Dict]) -> List[Dict]:
-    """Label all contracts using multi-LLM pipeline."""
-    labeled = []
-    
-    for i, row in enumerate(rows):
-        print(f"Labeling contract {i+1}/{len(rows)}...")
-        code = row["code"]
-        
-        gpt_label = label_with_gpt(code)
-        claude_label = label_with_claude(code)
-        gemini_label = label_with_gemini(code)
-        
-        # Agreement logic: unanimous -> gold label; otherwise needs_review = true
-        all_agree = (gpt_label == claude_label == gemini_label)
-        final_label = gpt_label if all_agree else gpt_label  # Use GPT as tiebreaker
-        confidence = compute_confidence(gpt_label, claude_label, gemini_label)
-        needs_review = not all_agree
-        
-        labeled.append({
-            "id": row["id"],
-            "code": code,
-            "gpt_label": gpt_label,
-            "claude_label": claude_label,
-            "gemini_label": gemini_label,
-            "final_label": final_label,
-            "confidence": str(confidence),
-            "needs_review": str(needs_review).lower()
-        })
-    
-    return labeled
+# Any require/assert/revert/throw at all; without one there is no balance check.
+_CHECK_RE = re.compile(r"\b(require|assert|revert|throw)\b")
 
 
-def compute_labeling_metrics(labeled: List[Dict]) -> Dict:
-    """Compute metrics for labeling pipeline."""
-    n = len(labeled)
-    agree_count = sum(1 for r in labeled if r["needs_review"] == "false")
-    avg_confidence = sum(float(r["confidence"]) for r in labeled) / max(1, n)
-    
+def prefilter(code: str) -> Optional[str]:
+    """
+    Label contracts whose verdict doesn't need an LLM.
+    Returns "unsafe" when the code has no guard statement outside comments and
+    strings, "safe" when genie_agent.prescreen() confirms the balance check
+    guards the debited slot, and None for everything else.
+    """
+    if not _CHECK_RE.search(blank_inert(code)):
+        return "unsafe"
+    screened = prescreen(code)
+    if screened is not None:
+        return screened["status"]
+    return None
+
+
+def _labeled_row(
+    row: Dict, gpt_label: Optional[str], claude_label: Optional[str], gemini_label: Optional[str],
+    source: str = "llm"
+) -> Dict:
+    """
+    Combine the three labels for a contract into its labeled row.
+    A labeler that errored out (None) is recorded as unsafe, and the row is
+    marked source=error and needs_review so it can't pass as a gold label.
+    """
+    errored = None in (gpt_label, claude_label, gemini_label)
+    if errored:
+        gpt_label, claude_label, gemini_label = (
+            label or "unsafe" for label in (gpt_label, claude_label, gemini_label)
+        )
+        source = "error"
+
+    # Agreement logic: unanimous -> gold label; otherwise needs_review = true
+    all_agree = (gpt_label == claude_label == gemini_label)
+    final_label = gpt_label if all_agree else gpt_label  # Use GPT as tiebreaker
+    confidence = compute_confidence(gpt_label, claude_label, gemini_label)
+    needs_review = errored or not all_agree
+
+    return {
+        "id": row["id"],
+        "code": row["code"],
+        "gpt_label": gpt_label,
+        "claude_label": claude_label,
+        "gemini_label": gemini_label,
+        "final_label": final_label,
+        "confidence": str(confidence),
+        "needs_review": str(needs_review).lower(),
+        "source": source
+    }
+
+
+async def _label_rows(sem: asyncio.Semaphore, rows: List[Dict]) -> List[Dict]:
+    """
+    Label a chunk of contracts with each labeler.
+    Cached labels are reused; the remaining contracts go out as a single batch
+    request per labeler, and if that reply can't be parsed, the labeler falls
+    back to one request per contract. A batch that fails with an API error is
+    not split up; its contracts are left without a verdict. With LABEL_TIEBREAK_ONLY, Gemini only
+    sees the contracts GPT and Claude disagree on.
+    """
+    codes = [row["code"] for row in rows]
+
+    async def bounded(coro):
+        async with sem:
+            return await coro
+
+    async def run_labeler(labeler: str, codes: List[str]) -> List[Optional[str]]:
+        keys = [_label_cache_key(labeler, code) for code in codes]
+        labels = [llm_cache.get(key) for key in keys]
+        missing = [i for i, label in enumerate(labels) if label is None]
+        if len(missing) > 1:
+            try:
+                batch = await bounded(label_chunk(labeler, [codes[i] for i in missing]))
+            except RETRYABLE_ERRORS as e:
+                # Retries are exhausted; these rows are left without a verdict (source=error)
+                print(f"Batch labeling error ({labeler}): {e}")
+                return labels
+            if batch is not None:
+                for i, label in zip(missing, batch):
+                    labels[i] = label
+                    llm_cache.put(keys[i], label)
+                missing = []
+        if missing:
+            label_fn = LABELERS[labeler][0]
+            found = await asyncio.gather(*[bounded(label_fn(codes[i])) for i in missing])
+            for i, label in zip(missing, found):
+                labels[i] = label
+        return labels
+
+    if not LABEL_TIEBREAK_ONLY:
+        gpt, claude, gemini = await asyncio.gather(*[run_labeler(name, codes) for name in LABELERS])
+    else:
+        gpt, claude = await asyncio.gather(run_labeler("gpt", codes), run_labeler("claude", codes))
+        gemini = list(gpt)
+        split = [i for i, (g, c) in enumerate(zip(gpt, claude)) if g != c]
+        if split:
+            tiebreaks = await run_labeler("gemini", [codes[i] for i in split])
+            for i, label in zip(split, tiebreaks):
+                gemini[i] = label
+    return [_labeled_row(*labels) for labels in zip(rows, gpt, claude, gemini)]
+
+
+def _groups(rows: Iterable[Dict]) -> Iterator[List[Tuple[Dict, Optional[str]]]]:
+    """
+    Split a row stream into consecutive groups holding up to LABEL_BATCH_SIZE
+    contracts that need the LLMs, each row paired with its prefilter label.
+    A group also closes at 4 * LABEL_BATCH_SIZE rows, so long runs of
+    prefiltered rows are still written out as they stream through.
+    """
+    size = max(1, LABEL_BATCH_SIZE)
+    group, n_pending = [], 0
+    for row in rows:
+        label = prefilter(row["code"]) if LABEL_PREFILTER else None
+        group.append((row, label))
+        n_pending += label is None
+        if n_pending >= size or len(group) >= 4 * size:
+            yield group
+            group, n_pending = [], 0
+    if group:
+        yield group
+
+
+async def label_batch(rows: Iterable[Dict]) -> AsyncIterator[Dict]:
+    """
+    Label a stream of contracts using multi-LLM pipeline.
+    Clear-cut contracts are labeled by prefilter(); the rest are sent
+    LABEL_BATCH_SIZE at a time. Groups are labeled concurrently, with at most
+    OPENAI_CONCURRENCY requests in flight, and rows are pulled lazily and
+    yielded in input order so memory stays bounded by the in-flight window.
+    """
+    sem = asyncio.Semaphore(OPENAI_CONCURRENCY)
+
+    async def label_group(group: List[Tuple[Dict, Optional[str]]]) -> List[Dict]:
+        pending = [row for row, label in group if label is None]
+        llm_rows = iter(await _label_rows(sem, pending) if pending else [])
+        return [
+            next(llm_rows) if label is None
+            else _labeled_row(row, label, label, label, source="heuristic")
+            for row, label in group
+        ]
+
+    async for labeled_rows in map_ordered(label_group, _groups(rows), window=2 * OPENAI_CONCURRENCY):
+        for labeled_row in labeled_rows:
+            yield labeled_row
+
+
+def summarize_labeling(n: int, agree_count: int, confidence_sum: float, prefiltered: int) -> Dict:
+    """Labeling metrics from running totals over n contracts."""
     return {
         "n_contracts": n,
         "agreement_rate": round(agree_count / max(1, n), 3),
-        "average_confidence": round(avg_confidence, 3),
-        "needs_review_count": n - agree_count
+        "average_confidence": round(confidence_sum / max(1, n), 3),
+        "needs_review_count": n - agree_count,
+        "prefiltered_count": prefiltered,
+        "prefilter_rate": round(prefiltered / max(1, n), 3)
     }
 
 
-def run(input_csv: str, output_csv: str, metrics_json: str):
-    """Run multi-LLM labeling pipeline."""
-    rows = read_csv(input_csv)
-    labeled = label_batch(rows)
-    
-    write_csv(
-        output_csv,
-        labeled,
-        fieldnames=["id", "code", "gpt_label", "claude_label", "gemini_label", 
-                   "final_label", "confidence", "needs_review"]
+def compute_labeling_metrics(labeled: List[Dict]) -> Dict:
+    """Compute metrics for labeling pipeline."""
+    return summarize_labeling(
+        len(labeled),
+        sum(1 for r in labeled if r["needs_review"] == "false"),
+        sum(float(r["confidence"]) for r in labeled),
+        sum(1 for r in labeled if r.get("source") == "heuristic")
     )
-    
-    metrics = compute_labeling_metrics(labeled)
+
+
+async def run_async(input_csv: str, output_csv: str, metrics_json: str):
+    """
+    Stream contracts from input_csv through the labelers.
+    Labeled rows are written as soon as they are ready and the metrics are
+    accumulated on the fly, so the dataset is never held in memory.
+    """
+    # Resolve the verdict tokens (a blocking download on a cold tiktoken cache) in a thread
+    await asyncio.get_running_loop().run_in_executor(None, _verdict_tokens)
+
+    n = agree_count = prefiltered = errored = 0
+    confidence_sum = 0.0
+    fieldnames = ["id", "code", "gpt_label", "claude_label", "gemini_label",
+                  "final_label", "confidence", "needs_review", "source"]
+    with csv_writer(output_csv, fieldnames=fieldnames) as writerow:
+        async for labeled in label_batch(iter_csv(input_csv)):
+            n += 1
+            print(f"Labeled contract {n}: id={labeled['id']} -> {labeled['final_label']} ({labeled['source']})")
+            writerow(labeled)
+            agree_count += labeled["needs_review"] == "false"
+            confidence_sum += float(labeled["confidence"])
+            prefiltered += labeled["source"] == "heuristic"
+            errored += labeled["source"] == "error"
+
+    metrics = summarize_labeling(n, agree_count, confidence_sum, prefiltered)
     write_json(metrics_json, metrics)
     
     print(f"Labeling complete. Saved to {output_csv}")
+    print(f"Prefilter labeled {prefiltered}/{n} contracts")
+    if errored:
+        print(f"{errored} contracts have a labeler error (source=error) and need review")
     print(f"Metrics saved to {metrics_json}")
 
 
+def run(input_csv: str, output_csv: str, metrics_json: str):
+    """Run multi-LLM labeling pipeline."""
+    asyncio.run(run_async(input_csv, output_csv, metrics_json))
+
+
 if __name__ == "__main__":
     run(
         "data/contracts_raw.csv",
@@ -0,0 +1,30 @@
+"""
+Helpers for running async LLM calls over a stream of rows.
+"""
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def map_ordered(
+    func: Callable[[T], Awaitable[R]], items: Iterable[T], window: int
+) -> AsyncIterator[R]:
+    """
+    Apply an async function to items with at most `window` calls scheduled at once.
+    Items are pulled from the iterable lazily and results are yielded in input
+    order, so callers can stream rows to disk without holding the whole dataset.
+    """
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(asyncio.ensure_future(func(item)))
+            if len(pending) >= window:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
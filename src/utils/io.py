@@ -1,19 +1,72 @@
-import csv, json, os
-from typing import List, Dict, Any
+import csv, io, os
+import orjson
+from contextlib import contextmanager
+from operator import itemgetter
+from typing import List, Dict, Any, Callable, Iterator, Sequence, Tuple
 
 def read_csv(path: str) -> List[Dict[str, Any]]:
+    return list(iter_csv(path))
+
+def iter_csv(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield rows as dicts; zips the C reader's lists with the header instead of using DictReader."""
+    with open(path, "r", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        for row in reader:
+            if row:
+                yield dict(zip(header, row))
+
+def read_columns(path: str, columns: Sequence[str]) -> Iterator[Tuple[str, ...]]:
+    """Yield only the named columns of each row as tuples, without building a dict per row."""
     with open(path, "r", newline="") as f:
-        return list(csv.DictReader(f))
+        reader = csv.reader(f)
+        header = next(reader)
+        get = itemgetter(*[header.index(c) for c in columns])
+        if len(columns) == 1:
+            for row in reader:
+                if row:
+                    yield (get(row),)
+        else:
+            for row in reader:
+                if row:
+                    yield get(row)
+
+_MADE_DIRS = set()
+
+def _ensure_dir(path: str):
+    """Create the parent directory of path, at most once per process."""
+    d = os.path.dirname(path)
+    if d and d not in _MADE_DIRS:
+        os.makedirs(d, exist_ok=True)
+        _MADE_DIRS.add(d)
 
 def write_csv(path: str, rows: List[Dict[str, Any]], fieldnames):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
+    """Render the whole CSV in memory, then write it to disk in one call."""
+    _ensure_dir(path)
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(fieldnames)
+    w.writerows([r.get(k, "") for k in fieldnames] for r in rows)
+    with open(path, "w", newline="") as f:
+        f.write(buf.getvalue())
+
+@contextmanager
+def csv_writer(path: str, fieldnames) -> Iterator[Callable[[Dict[str, Any]], None]]:
+    """Open a CSV for incremental writing; each row is flushed as soon as it is written."""
+    _ensure_dir(path)
     with open(path, "w", newline="") as f:
         w = csv.DictWriter(f, fieldnames=fieldnames)
         w.writeheader()
-        for r in rows:
-            w.writerow(r)
+
+        def writerow(row: Dict[str, Any]):
+            w.writerow(row)
+            f.flush()
+
+        yield writerow
 
 def write_json(path: str, data: Dict[str, Any]):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
+    _ensure_dir(path)
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
@@ -0,0 +1,57 @@
+"""
+On-disk cache for LLM responses.
+Parsed responses are stored as JSON in SQLite, keyed by a hash of the model,
+prompt and (canonicalized) input, so re-runs skip calls they have already paid for.
+"""
+import hashlib, json, os, re, sqlite3, threading
+from typing import Any, Optional
+from src.utils.solidity import COMMENT_RE
+
+DEFAULT_CACHE_PATH = "outputs/.cache/classify_cache.sqlite"
+
+_WS_RE = re.compile(r"\s+")
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+
+
+def canonicalize_code(code: str) -> str:
+    """Strip comments and collapse whitespace so formatting-only changes share a key."""
+    return _WS_RE.sub(" ", COMMENT_RE.sub("", code)).strip()
+
+
+def make_key(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def _connect() -> Optional[sqlite3.Connection]:
+    # Read the environment lazily so values loaded from .env are honoured.
+    global _conn
+    if os.getenv("LLM_CACHE", "1") == "0":
+        return None
+    if _conn is None:
+        path = os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        _conn = sqlite3.connect(path, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT)")
+        _conn.commit()
+    return _conn
+
+
+def get(key: str) -> Optional[Any]:
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return None
+        row = conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def put(key: str, value: Any) -> None:
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return
+        conn.execute("INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+        conn.commit()
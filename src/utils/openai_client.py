@@ -0,0 +1,49 @@
+"""
+Shared OpenAI client settings.
+Every module builds its clients here so they agree on timeouts, retries and
+which errors may be turned into fallback results.
+"""
+import os
+import openai
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+from src.utils.ratelimiter import backoff_on_429
+
+load_dotenv()
+
+# Maximum number of in-flight OpenAI requests per labeling or inference run.
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "16"))
+
+# The SDK retries connection errors, 429s and 5xx with exponential backoff.
+MAX_RETRIES = 5
+# Per-attempt timeout; connect fails fast so retries kick in instead of hanging.
+DEFAULT_TIMEOUT = openai.Timeout(60.0, connect=5.0)
+
+# Errors the SDK retries. Only these may become a fallback result once retries
+# are exhausted; anything else (bad key, no access, unknown model, rejected
+# parameters) is a configuration problem and is raised.
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+
+def make_client(api_key: str, timeout: openai.Timeout = DEFAULT_TIMEOUT, **kwargs) -> openai.OpenAI:
+    """Sync client with the shared retry and timeout settings."""
+    kwargs.setdefault("max_retries", MAX_RETRIES)
+    return openai.OpenAI(api_key=api_key, timeout=timeout, **kwargs)
+
+
+def make_async_client(
+    api_key: str,
+    timeout: openai.Timeout = DEFAULT_TIMEOUT,
+    http_options: Optional[Dict[str, Any]] = None,
+    **kwargs
+) -> openai.AsyncOpenAI:
+    """
+    Async client with the shared retry and timeout settings. Every 429 response
+    backs off the shared rate limiter as it arrives, before the SDK retries it.
+    http_options (e.g. limits) are passed to the underlying httpx client.
+    """
+    kwargs.setdefault("max_retries", MAX_RETRIES)
+    http_client = openai.DefaultAsyncHttpxClient(
+        event_hooks={"response": [backoff_on_429]}, **(http_options or {})
+    )
+    return openai.AsyncOpenAI(api_key=api_key, timeout=timeout, http_client=http_client, **kwargs)
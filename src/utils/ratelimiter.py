@@ -0,0 +1,83 @@
+"""
+Client-side rate limiting for OpenAI calls.
+A token bucket tracks requests per minute and tokens per minute so concurrent
+callers wait for capacity instead of running into 429 responses.
+"""
+import asyncio, os, time
+import httpx
+from typing import Optional
+
+# Lower bound for the backoff scale, as a fraction of the configured limits.
+MIN_SCALE = 0.1
+# Fraction of the configured limits recovered per second after a backoff.
+RECOVERY_PER_S = 0.01
+
+_limiter: Optional["AsyncRateLimiter"] = None
+
+
+class AsyncRateLimiter:
+    """
+    Token bucket over requests and tokens per minute.
+    Both buckets refill continuously at limit / 60 per second. A 429 halves the
+    effective limits, which then grow back linearly (AIMD).
+    """
+
+    def __init__(self, max_rpm: int, max_tpm: int):
+        self.max_rpm = max_rpm
+        self.max_tpm = max_tpm
+        self.scale = 1.0
+        self.requests_capacity = float(max_rpm)
+        self.tokens_capacity = float(max_tpm)
+        self._last_refill = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self.scale = min(1.0, self.scale + elapsed * RECOVERY_PER_S)
+        rpm, tpm = self.max_rpm * self.scale, self.max_tpm * self.scale
+        self.requests_capacity = min(rpm, self.requests_capacity + elapsed * rpm / 60)
+        self.tokens_capacity = min(tpm, self.tokens_capacity + elapsed * tpm / 60)
+
+    async def acquire(self, estimated_tokens: int = 0):
+        """Wait until one request and `estimated_tokens` tokens are available, then take them."""
+        while True:
+            self._refill()
+            rpm, tpm = self.max_rpm * self.scale, self.max_tpm * self.scale
+            # A single request larger than the whole budget would never fit
+            tokens = min(estimated_tokens, tpm)
+            if self.requests_capacity >= 1 and self.tokens_capacity >= tokens:
+                self.requests_capacity -= 1
+                self.tokens_capacity -= tokens
+                return
+            wait = max(
+                (1 - self.requests_capacity) * 60 / rpm,
+                (tokens - self.tokens_capacity) * 60 / tpm,
+            )
+            await asyncio.sleep(max(wait, 0.01))
+
+    def backoff(self):
+        """Halve the effective limits after a rate-limit error."""
+        self.scale = max(MIN_SCALE, self.scale / 2)
+        self.requests_capacity = min(self.requests_capacity, self.max_rpm * self.scale)
+        self.tokens_capacity = min(self.tokens_capacity, self.max_tpm * self.scale)
+
+
+async def backoff_on_429(response: httpx.Response):
+    """
+    httpx response hook that backs the limiter off on every 429, including the
+    ones the OpenAI SDK goes on to retry and never raises.
+    """
+    if response.status_code == 429:
+        get_limiter().backoff()
+
+
+def get_limiter() -> AsyncRateLimiter:
+    """Process-wide limiter for OpenAI calls, configured from OPENAI_MAX_RPM / OPENAI_MAX_TPM."""
+    global _limiter
+    if _limiter is None:
+        _limiter = AsyncRateLimiter(
+            max_rpm=int(os.getenv("OPENAI_MAX_RPM", "500")),
+            max_tpm=int(os.getenv("OPENAI_MAX_TPM", "200000"))
+        )
+    return _limiter
@@ -0,0 +1,14 @@
+"""
+Source-level helpers for Solidity snippets.
+"""
+import re
+
+# Line and block comments.
+COMMENT_RE = re.compile(r"//[^\n]*|/\*.*?\*/", re.S)
+# String literals and comments; code inside them never runs.
+INERT_RE = re.compile(r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|' + COMMENT_RE.pattern, re.S)
+
+
+def blank_inert(code: str) -> str:
+    """Replace comments and string literals with spaces, keeping offsets and line numbers."""
+    return INERT_RE.sub(lambda m: re.sub(r"[^\n]", " ", m.group()), code)
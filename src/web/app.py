@@ -1,11 +1,19 @@
 """
-Flask web application for contract safety chatbot.
+Quart (async Flask-compatible) web application for contract safety chatbot.
+Serve it with an ASGI server, e.g. `hypercorn src.web.app:app --workers 4`.
 """
 import os
-from flask import Flask, render_template, request, jsonify
-from flask_cors import CORS
+import signal
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+from quart import Quart, render_template, request, jsonify
+from quart_cors import cors
 from dotenv import load_dotenv
-from src.agents.genie_classifier import load_worksheet_template, classify_with_genie
+from src.agents.genie_classifier import load_worksheet_template, classify_with_genie_async
+from src.utils.openai_client import DEFAULT_TIMEOUT, MAX_RETRIES, make_async_client
+import httpx
 import openai
 
 load_dotenv()
@@ -13,10 +21,10 @@ load_dotenv()
 # Get the directory where this file is located
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-app = Flask(__name__, 
+app = Quart(__name__, 
             template_folder=os.path.join(BASE_DIR, 'templates'),
             static_folder=os.path.join(BASE_DIR, 'static'))
-CORS(app)
+app = cors(app)
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
@@ -24,29 +32,99 @@ OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY environment variable not set")
 
-# Load worksheet template once at startup
+# Upper bound for an /api/chat call. Retries are off, so a stalled call fails
+# after 20 s instead of hanging the request for the SDK's 10 minute default.
+CHAT_TIMEOUT_S = 20.0
+
+# Shared async chat client; keeps connections to the API alive across requests.
+_CLIENT = make_async_client(
+    OPENAI_API_KEY,
+    timeout=openai.Timeout(CHAT_TIMEOUT_S, connect=5.0),
+    max_retries=0,
+    http_options={
+        "limits": httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=120)
+    }
+)
+
+# Classification shares the connection pool but keeps the pipeline's timeout and retries.
+_CLASSIFY_CLIENT = _CLIENT.with_options(max_retries=MAX_RETRIES, timeout=DEFAULT_TIMEOUT)
+
+# Loaded on first use (load_worksheet_template memoizes it), not at import.
 WORKSHEET_TEMPLATE_PATH = "genie/worksheet_template.csv"
-worksheet_rows = load_worksheet_template(WORKSHEET_TEMPLATE_PATH)
+
+CHAT_SYSTEM_PROMPT = """You are a helpful Solidity security expert assistant. Your role is to help developers fix unsafe smart contracts.
+        
+When a contract is marked as UNSAFE, help the user understand the issues and provide specific, actionable fixes.
+When a contract is marked as SAFE, you can still help with improvements or answer questions about the code.
+        
+Be concise, practical, and provide code examples when relevant."""
+
+
+# Most recent results, oldest evicted first: classifications keyed by code,
+# chat replies keyed by (code, status, question).
+CLASSIFY_CACHE_SIZE = 512
+CHAT_CACHE_SIZE = 256
+_classify_cache: "OrderedDict[str, Dict]" = OrderedDict()
+_chat_cache: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+
+
+def _cache_get(cache: OrderedDict, key: Hashable) -> Any:
+    """Look up key and mark it most recently used; None when absent."""
+    if key not in cache:
+        return None
+    cache.move_to_end(key)
+    return cache[key]
+
+
+def _cache_put(cache: OrderedDict, key: Hashable, value: Any, size: int):
+    cache[key] = value
+    if len(cache) > size:
+        cache.popitem(last=False)
+
+
+async def classify_code(contract_code: str) -> Dict:
+    """Classify with genie, answering repeat submissions from memory."""
+    result = _cache_get(_classify_cache, contract_code)
+    if result is not None:
+        return result
+    worksheet_rows = load_worksheet_template(WORKSHEET_TEMPLATE_PATH)
+    result = await classify_with_genie_async(_CLASSIFY_CLIENT, worksheet_rows, contract_code)
+    # Error fallbacks are not memoized, so the next submission tries again
+    if not result.get("error"):
+        _cache_put(_classify_cache, contract_code, result, CLASSIFY_CACHE_SIZE)
+    return result
+
+
+def _clear_caches(signum=None, frame=None):
+    """Drop memoized classifications, chat replies and the worksheet (SIGHUP)."""
+    load_worksheet_template.cache_clear()
+    _classify_cache.clear()
+    _chat_cache.clear()
+
+
+# Signal handlers can only be installed from the main thread, and SIGHUP is POSIX-only.
+if hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread():
+    signal.signal(signal.SIGHUP, _clear_caches)
 
 
 @app.route("/")
-def index():
+async def index():
     """Serve the main chat interface."""
-    return render_template("index.html")
+    return await render_template("index.html")
 
 
 @app.route("/api/classify", methods=["POST"])
-def classify_contract():
+async def classify_contract():
     """Classify a contract as safe or unsafe using genie agent."""
     try:
-        data = request.json
+        data = await request.get_json()
         contract_code = data.get("code", "").strip()
         
         if not contract_code:
             return jsonify({"error": "No contract code provided"}), 400
         
         # Use genie classifier
-        result = classify_with_genie(worksheet_rows, contract_code)
+        result = await classify_code(contract_code)
         
         return jsonify({
             "status": result["status"],
@@ -58,11 +136,44 @@ def classify_contract():
         return jsonify({"error": str(e)}), 500
 
 
+async def _chat_reply(contract_code: str, classification_status: str, user_message: str) -> str:
+    """Ask the assistant about a contract; repeated questions are answered from memory."""
+    key = (contract_code, classification_status, user_message)
+    reply = _cache_get(_chat_cache, key)
+    if reply is not None:
+        return reply
+
+    user_prompt = f"""Contract Status: {classification_status.upper()}
+
+Contract Code:
+```solidity
+{contract_code}
+```
+
+User Question: {user_message}
+
+Please provide helpful guidance to fix or improve this contract."""
+
+    # The client timeout bounds each read; wait_for bounds the whole call.
+    response = await asyncio.wait_for(_CLIENT.chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[
+            {"role": "system", "content": CHAT_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ],
+        temperature=0.7,
+        max_tokens=1000
+    ), CHAT_TIMEOUT_S)
+    reply = (response.choices[0].message.content or "").strip()
+    _cache_put(_chat_cache, key, reply, CHAT_CACHE_SIZE)
+    return reply
+
+
 @app.route("/api/chat", methods=["POST"])
-def chat():
+async def chat():
     """Chat endpoint for helping fix unsafe contracts."""
     try:
-        data = request.json
+        data = await request.get_json()
         user_message = data.get("message", "").strip()
         contract_code = data.get("contract_code", "").strip()
         classification_status = data.get("status", "unknown")
@@ -73,41 +184,13 @@ def chat():
         if not contract_code:
             return jsonify({"error": "No contract code provided"}), 400
         
-        # Build context-aware prompt
-        system_prompt = """You are a helpful Solidity security expert assistant. Your role is to help developers fix unsafe smart contracts.
-        
-When a contract is marked as UNSAFE, help the user understand the issues and provide specific, actionable fixes.
-When a contract is marked as SAFE, you can still help with improvements or answer questions about the code.
-        
-Be concise, practical, and provide code examples when relevant."""
-        
-        user_prompt = f"""Contract Status: {classification_status.upper()}
-
-Contract Code:
-```solidity
-{contract_code}
-```
-
-User Question: {user_message}
-
-Please provide helpful guidance to fix or improve this contract."""
-        
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1000
-        )
-        
-        assistant_message = response.choices[0].message.content.strip()
+        assistant_message = await _chat_reply(contract_code, classification_status, user_message)
         
         return jsonify({
             "message": assistant_message
         })
+    except asyncio.TimeoutError:
+        return jsonify({"error": f"No reply within {CHAT_TIMEOUT_S:g} seconds, please try again"}), 504
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -0,0 +1,11 @@
+import pytest
+from src.utils import llm_cache
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_CACHE", "1")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(llm_cache, "_conn", None)
+    yield llm_cache
+    if llm_cache._conn is not None:
+        llm_cache._conn.close()
@@ -1,4 +1,4 @@
-from src.agents.genie_agent import classify_and_explain
+from src.agents.genie_agent import classify_and_explain, prescreen
 
 SAFE = """function transfer(address to, uint256 amount) public {
     require(balances[msg.sender] >= amount, "Insufficient");
@@ -13,12 +13,133 @@ UNSAFE = """function transfer(address to, uint256 amount) public {
 }
 """
 
+WRONG_SLOT = """function transfer(address to, uint256 amount) public {
+    require(balances[to] >= amount);
+    balances[msg.sender] -= amount;
+    balances[to] += amount;
+}
+"""
+
+COMMENTED_OUT = """function transfer(address to, uint256 amount) public {
+    // require(balances[msg.sender] >= amount);
+    balances[msg.sender] -= amount;
+    balances[to] += amount;
+}
+"""
+
+BYPASSABLE = """function transfer(address to, uint256 amount) public {
+    require(balances[msg.sender] >= amount || msg.sender == owner);
+    balances[msg.sender] -= amount;
+    balances[to] += amount;
+}
+"""
+
+BLOCK_COMMENT = """function transfer(address to, uint256 amount) public {
+    /* require(balances[msg.sender] >= amount); */
+    balances[msg.sender] -= amount;
+    balances[to] += amount;
+}
+"""
+
+STRING_LITERAL = """function transfer(address to, uint256 amount) public {
+    emit Log("require(balances[msg.sender] >= amount)");
+    balances[msg.sender] -= amount;
+    balances[to] += amount;
+}
+"""
+
+CONDITIONAL = """function transfer(address to, uint256 amount) public {
+    if (debug) { require(balances[msg.sender] >= amount); }
+    balances[msg.sender] -= amount;
+    balances[to] += amount;
+}
+"""
+
+ELSE_BRANCH = """function transfer(address to, uint256 amount) public {
+    if (msg.sender == owner) {
+        emit OwnerTransfer(to, amount);
+    } else {
+        require(balances[msg.sender] >= amount, "Insufficient");
+    }
+    balances[msg.sender] -= amount;
+    balances[to] += amount;
+}
+"""
+
+UNBRACED_IF = """function transfer(address to, uint256 amount) public {
+    if (!paused) require(balances[msg.sender] >= amount);
+    balances[msg.sender] -= amount;
+    balances[to] += amount;
+}
+"""
+
+COMMENTED_DEBIT = """function transfer(address to, uint256 amount) public {
+    require(balances[msg.sender] >= amount);
+    // balances[msg.sender] -= amount;
+    balances[to] += amount;
+}
+"""
+
+def _transfer(body: str) -> str:
+    return "function transfer(address to, uint256 amount) public {\n" + body + "}\n"
+
+CHECK = "    require(balances[msg.sender] >= amount);\n"
+DEBIT = "    balances[msg.sender] -= amount;\n"
+CREDIT = "    balances[to] += amount;\n"
+
+PARTIAL_DEBIT = _transfer(CHECK + "    balances[msg.sender] -= amount / 2;\n" + CREDIT)
+EXTRA_DEBIT = _transfer(CHECK + "    balances[msg.sender] -= amount + 1;\n" + CREDIT)
+DOUBLE_CREDIT = _transfer(CHECK + DEBIT + "    balances[to] += amount * 2;\n")
+CONDITIONAL_DEBIT = _transfer(CHECK + "    if (to != owner) {\n    " + DEBIT + "    }\n" + CREDIT)
+SELF_CREDIT = _transfer(CHECK + DEBIT + "    balances[msg.sender] += amount;\n")
+LOOP_CHECK = _transfer("    for (uint i = 0; i < n; i++) {\n    " + CHECK + "    }\n" + DEBIT + CREDIT)
+UNCALLED_CHECK = (
+    "function check(uint256 amount) internal view {\n" + CHECK + "}\n" + _transfer(DEBIT + CREDIT)
+)
+
 def test_safe_detection():
     r = classify_and_explain(SAFE)
     assert r["status"] == "safe"
-    assert r["citation_line"] is not None
+    assert r["citation_line"] == 2
 
 def test_unsafe_detection():
     r = classify_and_explain(UNSAFE)
     assert r["status"] == "unsafe"
     assert r["citation_line"] is None
+
+def test_prescreen_confident_safe():
+    r = prescreen(SAFE)
+    assert r["status"] == "safe"
+    assert r["citation_line"] == 2
+
+def test_prescreen_defers_to_llm():
+    assert prescreen(UNSAFE) is None
+    assert prescreen(WRONG_SLOT) is None
+    assert prescreen(COMMENTED_OUT) is None
+    assert prescreen(BYPASSABLE) is None
+
+def test_prescreen_ignores_inert_checks():
+    assert prescreen(BLOCK_COMMENT) is None
+    assert prescreen(STRING_LITERAL) is None
+    assert prescreen(COMMENTED_DEBIT) is None
+
+def test_prescreen_ignores_conditional_checks():
+    assert prescreen(CONDITIONAL) is None
+    assert prescreen(ELSE_BRANCH) is None
+    assert prescreen(UNBRACED_IF) is None
+
+def test_prescreen_keeps_citation_line_after_comments():
+    code = "/* transfer\n   with a check */\n" + SAFE
+    assert prescreen(code)["citation_line"] == 4
+
+def test_prescreen_requires_exact_amounts():
+    assert prescreen(PARTIAL_DEBIT) is None
+    assert prescreen(EXTRA_DEBIT) is None
+    assert prescreen(DOUBLE_CREDIT) is None
+    assert prescreen(SELF_CREDIT) is None
+
+def test_prescreen_requires_unconditional_updates():
+    assert prescreen(CONDITIONAL_DEBIT) is None
+    assert prescreen(LOOP_CHECK) is None
+    assert prescreen(UNCALLED_CHECK) is None
+    assert prescreen(_transfer(CHECK + DEBIT + CREDIT))["status"] == "safe"
@@ -0,0 +1,70 @@
+import os
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import asyncio
+import pytest
+from src.web import app as web
+
+@pytest.fixture
+def client(monkeypatch):
+    web._clear_caches()
+    monkeypatch.setattr(web, "load_worksheet_template", lambda path: [])
+    yield web.app.test_client()
+    web._classify_cache.clear()
+    web._chat_cache.clear()
+
+def post(client, path, payload):
+    async def send():
+        response = await client.post(path, json=payload)
+        return response.status_code, await response.get_json()
+    return asyncio.run(send())
+
+def test_classify_requires_code(client):
+    assert post(client, "/api/classify", {"code": "  "}) == (400, {"error": "No contract code provided"})
+
+def test_classify_memoizes_results(client, monkeypatch):
+    calls = []
+
+    async def classify(client, rows, code):
+        calls.append(code)
+        return {"status": "safe", "reasoning": "r", "evidence_summary": "s"}
+
+    monkeypatch.setattr(web, "classify_with_genie_async", classify)
+    for _ in range(2):
+        status, body = post(client, "/api/classify", {"code": "contract C {}"})
+        assert status == 200
+        assert body == {"status": "safe", "reasoning": "r", "evidence_summary": "s", "evidence": {}}
+    assert calls == ["contract C {}"]
+
+def test_classify_retries_after_errors(client, monkeypatch):
+    calls = []
+
+    async def classify(client, rows, code):
+        calls.append(code)
+        return {"status": "unsafe", "reasoning": "r", "evidence_summary": "s", "error": "boom"}
+
+    monkeypatch.setattr(web, "classify_with_genie_async", classify)
+    post(client, "/api/classify", {"code": "contract C {}"})
+    post(client, "/api/classify", {"code": "contract C {}"})
+    assert len(calls) == 2
+
+def test_chat_requires_message(client):
+    assert post(client, "/api/chat", {"contract_code": "contract C {}"}) == (400, {"error": "No message provided"})
+
+def test_chat_replies(client, monkeypatch):
+    async def reply(code, status, message):
+        return f"{status}: {message}"
+
+    monkeypatch.setattr(web, "_chat_reply", reply)
+    payload = {"message": "why?", "contract_code": "contract C {}", "status": "unsafe"}
+    assert post(client, "/api/chat", payload) == (200, {"message": "unsafe: why?"})
+
+def test_chat_timeout_returns_504(client, monkeypatch):
+    async def reply(code, status, message):
+        raise asyncio.TimeoutError
+
+    monkeypatch.setattr(web, "_chat_reply", reply)
+    payload = {"message": "why?", "contract_code": "contract C {}"}
+    status, body = post(client, "/api/chat", payload)
+    assert status == 504
+    assert "No reply within" in body["error"]
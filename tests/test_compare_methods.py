@@ -0,0 +1,32 @@
+from src.evaluation.compare_methods import compare_methods
+from src.utils.io import write_csv
+
+FIELDS = ["id", "gold_label", "agent_status"]
+
+def test_compare_methods_joins_on_id(tmp_path):
+    baseline = tmp_path / "baseline.csv"
+    genie = tmp_path / "genie.csv"
+    write_csv(str(baseline), [
+        {"id": "0", "gold_label": "safe", "agent_status": "safe"},
+        {"id": "1", "gold_label": "unsafe", "agent_status": "safe"},
+        {"id": "2", "gold_label": "unsafe", "agent_status": "unsafe"},
+        {"id": "3", "gold_label": "safe", "agent_status": "unsafe"},
+    ], FIELDS)
+    # Different row order and one id missing from genie
+    write_csv(str(genie), [
+        {"id": "2", "gold_label": "unsafe", "agent_status": "safe"},
+        {"id": "1", "gold_label": "unsafe", "agent_status": "unsafe"},
+        {"id": "0", "gold_label": "safe", "agent_status": "safe"},
+    ], FIELDS)
+
+    r = compare_methods(str(baseline), str(genie))
+    assert r["genie_vs_baseline"] == {
+        "n_examples": 3,
+        "agreement_rate": 0.333,
+        "baseline_safe_genie_unsafe": 1,
+        "baseline_unsafe_genie_safe": 1,
+        "disagreement_rate": 0.667
+    }
+    assert r["baseline_vs_gold"]["confusion_matrix"] == {"tp": 1, "tn": 1, "fp": 1, "fn": 1}
+    assert r["genie_vs_gold"]["n_examples"] == 3
+    assert r["summary"]["genie_accuracy"] == r["genie_vs_gold"]["accuracy"]
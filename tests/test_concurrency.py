@@ -0,0 +1,47 @@
+import asyncio
+from src.utils.concurrency import map_ordered
+
+def test_map_ordered_keeps_input_order():
+    async def slow_square(x):
+        await asyncio.sleep(0.01 * (5 - x))
+        return x * x
+
+    async def collect():
+        return [y async for y in map_ordered(slow_square, range(5), window=3)]
+
+    assert asyncio.run(collect()) == [0, 1, 4, 9, 16]
+
+def test_map_ordered_bounds_scheduled_calls():
+    started = []
+
+    async def record(x):
+        started.append(x)
+        await asyncio.sleep(0)
+        return x
+
+    async def first():
+        gen = map_ordered(record, iter(range(100)), window=4)
+        value = await gen.__anext__()
+        await gen.aclose()
+        return value
+
+    assert asyncio.run(first()) == 0
+    assert len(started) <= 4
+
+def test_map_ordered_cancels_pending_calls():
+    tasks = []
+
+    async def hang(x):
+        tasks.append(asyncio.current_task())
+        if x:
+            await asyncio.sleep(10)
+        return x
+
+    async def close_early():
+        gen = map_ordered(hang, range(3), window=3)
+        assert await gen.__anext__() == 0
+        await gen.aclose()
+        await asyncio.sleep(0)
+        return [t.cancelled() for t in tasks[1:]]
+
+    assert asyncio.run(close_early()) == [True, True]
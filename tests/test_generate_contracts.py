@@ -0,0 +1,24 @@
+import os
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import orjson
+from src.generation.generate_contracts import parse_batch_output
+
+def _line(custom_id: str, status_code: int, content):
+    return orjson.dumps({
+        "custom_id": custom_id,
+        "response": {
+            "status_code": status_code,
+            "body": {"choices": [{"message": {"role": "assistant", "content": content}}]}
+        }
+    }).decode()
+
+def test_parse_batch_output():
+    output = "\n".join([
+        _line("0", 200, "```solidity\nfunction transfer() public {}\n```"),
+        _line("1", 200, None),
+        _line("2", 500, "ignored"),
+        "",
+        _line("3", 200, "function f() public {}"),
+    ])
+    assert parse_batch_output(output) == {0: "function transfer() public {}", 3: "function f() public {}"}
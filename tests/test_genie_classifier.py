@@ -0,0 +1,40 @@
+import os
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from src.agents.genie_classifier import parse_genie_response
+
+RESPONSE = """DECISION: SAFE
+BALANCE_CHECK: true - require(balances[msg.sender] >= amount) on line 2
+ARITHMETIC_SAFETY: true - Solidity 0.8 checked arithmetic
+ACCESS_CONTROL: false - none needed
+INPUT_VALIDATION: false - to is not checked
+STATE_CONSISTENCY: true - debit and credit match
+REASONING: The balance is checked before it is debited."""
+
+def test_parse_response():
+    r = parse_genie_response(RESPONSE)
+    assert r["status"] == "safe"
+    assert r["reasoning"] == "The balance is checked before it is debited."
+    assert r["evidence"]["balance_check"] == {
+        "has_check": True,
+        "evidence": "require(balances[msg.sender] >= amount) on line 2"
+    }
+    assert r["evidence"]["access_control"]["has_control"] is False
+    assert len(r["evidence"]) == 5
+
+def test_parse_response_without_decision():
+    raw = "BALANCE_CHECK: false - no require\nREASONING: Nothing guards the debit."
+    r = parse_genie_response(raw)
+    assert r["status"] == "unsafe"
+    assert r["reasoning"] == raw
+    assert parse_genie_response("The function looks SAFE.")["status"] == "safe"
+
+def test_parse_response_first_decision_wins():
+    r = parse_genie_response("DECISION: UNSAFE\nREASONING: No check.\nDECISION: SAFE")
+    assert r["status"] == "unsafe"
+
+def test_parse_response_multiline_reasoning():
+    raw = "DECISION: UNSAFE\nREASONING: The debit is\nnot guarded.\n\nBALANCE_CHECK: false - missing"
+    r = parse_genie_response(raw)
+    assert r["reasoning"] == "The debit is not guarded."
+    assert r["evidence"]["balance_check"]["has_check"] is False
@@ -0,0 +1,31 @@
+import asyncio
+import json
+from src.pipeline.inference import run_inference_async
+from src.utils.io import read_csv, write_csv
+
+def test_identical_code_is_classified_once(tmp_path):
+    labeled = tmp_path / "labeled.csv"
+    write_csv(str(labeled), [
+        {"id": "0", "code": "a", "final_label": "safe"},
+        {"id": "1", "code": "b", "final_label": "unsafe"},
+        {"id": "2", "code": "a", "final_label": "unsafe"},
+        {"id": "3", "code": "a", "final_label": "safe"},
+    ], fieldnames=["id", "code", "final_label"])
+    calls = []
+
+    async def classify(code):
+        calls.append(code)
+        await asyncio.sleep(0.01)
+        return {"status": "safe" if code == "a" else "unsafe", "explanation": f"saw {code}"}
+
+    metrics = asyncio.run(run_inference_async(
+        "Test", str(labeled), str(tmp_path / "out.csv"), str(tmp_path / "metrics.json"),
+        classify=classify, columns=["explanation"]
+    ))
+    assert sorted(calls) == ["a", "b"]
+    rows = read_csv(str(tmp_path / "out.csv"))
+    assert [r["id"] for r in rows] == ["0", "1", "2", "3"]
+    assert [r["explanation"] for r in rows] == ["saw a", "saw b", "saw a", "saw a"]
+    assert rows[0]["source"] == "llm"
+    assert metrics["confusion"] == {"tp": 2, "tn": 1, "fp": 1, "fn": 0}
+    assert json.loads((tmp_path / "metrics.json").read_text()) == metrics
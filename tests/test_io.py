@@ -0,0 +1,41 @@
+import os
+from src.utils.io import iter_csv, read_columns, read_csv, write_csv
+
+CSV = 'id,code,final_label\n0,"a, ""quoted""\nline",safe\n\n1,b,unsafe\n'
+
+def test_read_columns(tmp_path):
+    path = tmp_path / "rows.csv"
+    path.write_text(CSV)
+    assert list(read_columns(str(path), ["final_label", "id"])) == [("safe", "0"), ("unsafe", "1")]
+    assert list(read_columns(str(path), ["id"])) == [("0",), ("1",)]
+
+def test_iter_csv(tmp_path):
+    path = tmp_path / "rows.csv"
+    path.write_text(CSV)
+    rows = list(iter_csv(str(path)))
+    assert rows == [
+        {"id": "0", "code": 'a, "quoted"\nline', "final_label": "safe"},
+        {"id": "1", "code": "b", "final_label": "unsafe"},
+    ]
+    assert read_csv(str(path)) == rows
+    empty = tmp_path / "empty.csv"
+    empty.write_text("")
+    assert read_csv(str(empty)) == []
+
+def test_write_csv(tmp_path, monkeypatch):
+    path = tmp_path / "out" / "rows.csv"
+    rows = [{"id": "0", "code": 'a, "quoted"\nline', "extra": "dropped"}, {"id": "1"}]
+    write_csv(str(path), rows, fieldnames=["id", "code"])
+    assert path.read_bytes() == b'id,code\r\n0,"a, ""quoted""\nline"\r\n1,\r\n'
+    assert read_csv(str(path)) == [{"id": "0", "code": 'a, "quoted"\nline'}, {"id": "1", "code": ""}]
+
+    # The output directory is only created once per process
+    calls = []
+    monkeypatch.setattr(os, "makedirs", lambda *a, **k: calls.append(a))
+    write_csv(str(path), rows, fieldnames=["id"])
+    assert calls == []
+
+def test_write_csv_bare_filename(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_csv("rows.csv", [{"id": "0"}], fieldnames=["id"])
+    assert read_csv("rows.csv") == [{"id": "0"}]
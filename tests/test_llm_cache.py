@@ -0,0 +1,31 @@
+import os
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import httpx
+import openai
+from src.agents import baseline_classifier
+from src.utils import llm_cache
+
+def test_key_ignores_comments_and_whitespace():
+    a = "function f() {\n    // check\n    x = 1; /* done */\n}"
+    b = "function f() { x = 1; }"
+    assert llm_cache.canonicalize_code(a) == llm_cache.canonicalize_code(b)
+    assert llm_cache.make_key("m", "p", llm_cache.canonicalize_code(a)) == llm_cache.make_key("m", "p", b)
+    assert llm_cache.make_key("m", "p", b) != llm_cache.make_key("m2", "p", b)
+
+def test_get_put_roundtrip(cache):
+    assert cache.get("k") is None
+    cache.put("k", {"status": "safe"})
+    assert cache.get("k") == {"status": "safe"}
+
+def test_error_fallbacks_are_not_cached(cache, monkeypatch):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+    def fail(**kwargs):
+        raise openai.APIConnectionError(request=request)
+
+    monkeypatch.setattr(baseline_classifier._CLIENT.chat.completions, "create", fail)
+    result = baseline_classifier.classify("function f() {}")
+    assert result["status"] == "unsafe"
+    assert result["explanation"].startswith("Error during classification")
+    assert cache.get(baseline_classifier._cache_key("function f() {}")) is None
@@ -0,0 +1,192 @@
+import os
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import asyncio
+import httpx
+import openai
+from src.pipeline import llm_labeler
+from src.pipeline.llm_labeler import _normalize_label, _parse_verdict, parse_batch_labels, prefilter
+from tests import test_agent
+
+SAFE = """function transfer(address to, uint256 amount) public {
+    require(balances[msg.sender] >= amount);
+    balances[msg.sender] -= amount;
+    balances[to] += amount;
+}
+"""
+
+NO_CHECK = """function transfer(address to, uint256 amount) public {
+    balances[msg.sender] -= amount;
+    balances[to] += amount;
+}
+"""
+
+UNCLEAR = """function transfer(address to, uint256 amount) public {
+    require(to != address(0));
+    balances[msg.sender] -= amount;
+    balances[to] += amount;
+}
+"""
+
+COMMENTED_CHECK = """function transfer(address to, uint256 amount) public {
+    // require(balances[msg.sender] >= amount);
+    balances[msg.sender] -= amount;
+    balances[to] += amount;
+}
+"""
+
+def test_parse_batch_labels():
+    assert parse_batch_labels('{"labels": ["SAFE", "unsafe", " Safe "]}', 3) == ["safe", "unsafe", "safe"]
+
+def test_parse_batch_labels_wrong_count():
+    assert parse_batch_labels('{"labels": ["SAFE", "UNSAFE"]}', 3) is None
+
+def test_parse_batch_labels_bad_entry():
+    assert parse_batch_labels('{"labels": ["SAFE", "MAYBE"]}', 2) is None
+    assert parse_batch_labels('{"labels": "SAFE"}', 1) is None
+
+def test_parse_batch_labels_invalid_json():
+    assert parse_batch_labels('["SAFE"]', 1) is None
+    assert parse_batch_labels('{"labels": ["SAFE"', 1) is None
+    assert parse_batch_labels("", 1) is None
+
+def test_normalize_label():
+    assert _normalize_label("SAFE") == "safe"
+    assert _normalize_label(" unsafe.\n") == "unsafe"
+    assert _normalize_label("The function is UNSAFE") == "unsafe"
+    assert _normalize_label("It is safe") == "safe"
+    assert _normalize_label("") == "unsafe"
+
+def test_parse_verdict(monkeypatch):
+    monkeypatch.setattr(llm_labeler, "_verdict_tokens", lambda: ({"1": 100, "2": 100}, {"SAFE": "safe", "UN": "unsafe"}))
+    assert _parse_verdict("UN") == "unsafe"
+    assert _parse_verdict("SAFE") == "safe"
+    monkeypatch.setattr(llm_labeler, "_verdict_tokens", lambda: None)
+    assert _parse_verdict("UNSAFE") == "unsafe"
+
+def test_prefilter():
+    assert prefilter(NO_CHECK) == "unsafe"
+    assert prefilter(SAFE) == "safe"
+    assert prefilter(UNCLEAR) is None
+    assert prefilter(COMMENTED_CHECK) == "unsafe"
+    for name in ("PARTIAL_DEBIT", "EXTRA_DEBIT", "DOUBLE_CREDIT", "CONDITIONAL_DEBIT",
+                 "SELF_CREDIT", "LOOP_CHECK", "UNCALLED_CHECK"):
+        assert prefilter(getattr(test_agent, name)) is None, name
+
+def test_groups_are_bounded(monkeypatch):
+    monkeypatch.setattr(llm_labeler, "LABEL_BATCH_SIZE", 10)
+    monkeypatch.setattr(llm_labeler, "LABEL_PREFILTER", True)
+    rows = [{"id": str(i), "code": NO_CHECK} for i in range(1000)] + [{"id": "x", "code": UNCLEAR}]
+    groups = list(llm_labeler._groups(rows))
+    assert max(len(g) for g in groups) == 40
+    assert sum(len(g) for g in groups) == 1001
+    assert groups[-1][-1] == (rows[-1], None)
+
+def test_label_rows_falls_back_per_contract(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE", "0")
+    monkeypatch.setattr(llm_labeler, "LABEL_TIEBREAK_ONLY", False)
+    calls = []
+
+    async def unusable_batch(labeler, codes):
+        calls.append((labeler, len(codes)))
+        return None
+
+    def single(label):
+        async def label_fn(code):
+            return label
+        return label_fn
+
+    monkeypatch.setattr(llm_labeler, "label_chunk", unusable_batch)
+    monkeypatch.setitem(llm_labeler.LABELERS, "gpt", (single("safe"), 0.0))
+    monkeypatch.setitem(llm_labeler.LABELERS, "claude", (single("safe"), 0.1))
+    monkeypatch.setitem(llm_labeler.LABELERS, "gemini", (single("unsafe"), 0.2))
+
+    async def label():
+        rows = [{"id": "1", "code": UNCLEAR}, {"id": "2", "code": UNCLEAR + " "}]
+        return await llm_labeler._label_rows(asyncio.Semaphore(4), rows)
+
+    labeled = asyncio.run(label())
+    assert sorted(calls) == [("claude", 2), ("gemini", 2), ("gpt", 2)]
+    assert [r["id"] for r in labeled] == ["1", "2"]
+    assert all(r["final_label"] == "safe" and r["needs_review"] == "true" for r in labeled)
+    assert labeled[0]["confidence"] == "0.67"
+
+def test_labeled_row_marks_labeler_errors():
+    row = {"id": "1", "code": UNCLEAR}
+    r = llm_labeler._labeled_row(row, None, "unsafe", "unsafe")
+    assert r["gpt_label"] == r["final_label"] == "unsafe"
+    assert r["source"] == "error"
+    assert r["needs_review"] == "true"
+    assert llm_labeler._labeled_row(row, "unsafe", "unsafe", "unsafe")["needs_review"] == "false"
+
+def test_label_rows_does_not_split_failed_batches(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE", "0")
+    monkeypatch.setattr(llm_labeler, "LABEL_TIEBREAK_ONLY", False)
+    singles = []
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+    async def rate_limited(labeler, codes):
+        raise openai.RateLimitError("rate limited", response=httpx.Response(429, request=request), body=None)
+
+    async def label_fn(code):
+        singles.append(code)
+        return "safe"
+
+    monkeypatch.setattr(llm_labeler, "label_chunk", rate_limited)
+    for name, (_, temperature) in list(llm_labeler.LABELERS.items()):
+        monkeypatch.setitem(llm_labeler.LABELERS, name, (label_fn, temperature))
+
+    async def label():
+        rows = [{"id": "1", "code": UNCLEAR}, {"id": "2", "code": UNCLEAR + " "}]
+        return await llm_labeler._label_rows(asyncio.Semaphore(4), rows)
+
+    labeled = asyncio.run(label())
+    assert singles == []
+    assert all(r["source"] == "error" and r["needs_review"] == "true" for r in labeled)
+
+def test_label_rows_tiebreak_only(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE", "0")
+    monkeypatch.setattr(llm_labeler, "LABEL_TIEBREAK_ONLY", True)
+    codes = ["A", "B", "C"]
+    verdicts = {"gpt": ["safe", "safe", "unsafe"], "claude": ["safe", "unsafe", "unsafe"]}
+    gemini_codes = []
+
+    async def batch(labeler, batch_codes):
+        if labeler == "gemini":
+            gemini_codes.extend(batch_codes)
+            return ["unsafe"] * len(batch_codes)
+        return [verdicts[labeler][codes.index(c)] for c in batch_codes]
+
+    async def gemini_single(code):
+        gemini_codes.append(code)
+        return "unsafe"
+
+    monkeypatch.setattr(llm_labeler, "label_chunk", batch)
+    monkeypatch.setitem(llm_labeler.LABELERS, "gemini", (gemini_single, 0.2))
+
+    async def label():
+        rows = [{"id": str(i), "code": code} for i, code in enumerate(codes)]
+        return await llm_labeler._label_rows(asyncio.Semaphore(4), rows)
+
+    agree_safe, split, agree_unsafe = asyncio.run(label())
+    assert gemini_codes == ["B"]
+    for r in (agree_safe, agree_unsafe):
+        assert r["gemini_label"] == r["gpt_label"]
+        assert r["confidence"] == "1.0"
+        assert r["needs_review"] == "false"
+    assert split["gemini_label"] == "unsafe"
+    assert split["needs_review"] == "true"
+    assert split["confidence"] == "0.67"
+
+def test_label_cache_key():
+    key = llm_labeler._label_cache_key("gpt", SAFE)
+    assert key == llm_labeler._label_cache_key("gpt", "// cached\n" + SAFE.replace("    ", "\t"))
+    assert key != llm_labeler._label_cache_key("claude", SAFE)
+
+def test_cached_labels_skip_the_api(cache, monkeypatch):
+    async def fail(*args, **kwargs):
+        raise AssertionError("API called for a cached label")
+
+    monkeypatch.setattr(llm_labeler, "_create_completion", fail)
+    cache.put(llm_labeler._label_cache_key("claude", SAFE), "safe")
+    assert asyncio.run(llm_labeler.label_with_claude(SAFE)) == "safe"
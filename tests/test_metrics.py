@@ -0,0 +1,22 @@
+from src.pipeline.inference_metrics import count_confusion, summarize
+
+ROWS = [
+    ("safe", "safe"),
+    ("safe", "unsafe"),
+    ("unsafe", "unsafe"),
+    ("unsafe", "unsafe"),
+    ("unsafe", "safe"),
+]
+
+def test_count_confusion():
+    c = count_confusion(ROWS)
+    assert c[("safe", "safe")] == 1
+    assert c[("safe", "unsafe")] == 1
+    assert c[("unsafe", "unsafe")] == 2
+    assert c[("unsafe", "safe")] == 1
+
+def test_summarize():
+    m = summarize(count_confusion(ROWS), len(ROWS))
+    assert m["n_examples"] == 5
+    assert m["accuracy"] == 0.6
+    assert m["confusion"] == {"tp": 1, "tn": 2, "fp": 1, "fn": 1}
@@ -0,0 +1,46 @@
+import asyncio
+import httpx
+from src.utils import ratelimiter
+from src.utils.openai_client import make_async_client
+from src.utils.ratelimiter import AsyncRateLimiter, MIN_SCALE, backoff_on_429
+
+def test_acquire_takes_capacity():
+    limiter = AsyncRateLimiter(max_rpm=60, max_tpm=1000)
+    asyncio.run(limiter.acquire(estimated_tokens=400))
+    assert limiter.requests_capacity < 60
+    assert limiter.tokens_capacity < 601
+
+def test_acquire_waits_for_refill():
+    # 6000 rpm refills one request every 10 ms
+    limiter = AsyncRateLimiter(max_rpm=6000, max_tpm=10**6)
+    limiter.requests_capacity = 0.0
+
+    async def timed():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await limiter.acquire()
+        return loop.time() - start
+
+    assert asyncio.run(timed()) >= 0.005
+
+def test_backoff_halves_limits():
+    limiter = AsyncRateLimiter(max_rpm=100, max_tpm=1000)
+    limiter.backoff()
+    assert limiter.scale == 0.5
+    assert limiter.requests_capacity == 50
+    assert limiter.tokens_capacity == 500
+    for _ in range(10):
+        limiter.backoff()
+    assert limiter.scale == MIN_SCALE
+
+def test_429_responses_back_off_the_limiter(monkeypatch):
+    monkeypatch.setattr(ratelimiter, "_limiter", AsyncRateLimiter(max_rpm=100, max_tpm=1000))
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    asyncio.run(backoff_on_429(httpx.Response(200, request=request)))
+    assert ratelimiter.get_limiter().scale == 1.0
+    asyncio.run(backoff_on_429(httpx.Response(429, request=request)))
+    assert ratelimiter.get_limiter().scale == 0.5
+
+def test_async_clients_report_429s():
+    client = make_async_client("test")
+    assert backoff_on_429 in client._client.event_hooks["response"]